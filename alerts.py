@@ -0,0 +1,106 @@
+import os
+import re
+import time
+from collections import OrderedDict
+
+ERROR_WINDOW = int(os.getenv('ERROR_WINDOW', 3600))
+ERROR_MAX_KEYS = int(os.getenv('ERROR_MAX_KEYS', 10000))
+VOLATILE = re.compile(r'0x[0-9a-fA-F]+|\d+\.\d+|\d{4,}')
+
+
+def normalise(text):
+    """Текст ошибки без изменчивых частей: адресов, дробных чисел
+    и длинных чисел вроде временных меток. Коды ответов остаются.
+    """
+    return ' '.join(VOLATILE.sub('#', text).split())
+
+
+def format_window(seconds):
+    """Окно агрегации для текста сводки."""
+    if seconds == 3600:
+        return 'последний час'
+    if seconds % 3600 == 0:
+        return f'последние {seconds // 3600} ч'
+    return f'последние {max(seconds // 60, 1)} мин'
+
+
+class Entry:
+    """Сведения об одной ошибке в окне агрегации."""
+
+    __slots__ = ('message', 'sent_at', 'repeats')
+
+    def __init__(self, message, sent_at):
+        self.message = message
+        self.sent_at = sent_at
+        self.repeats = 0
+
+
+class ErrorAggregator:
+    """Подавление повторов ошибок в пределах окна.
+    Ключ ошибки — область (арендатор), класс исключения и нормализованный
+    текст, поэтому чередующиеся ошибки не отправляются каждый цикл.
+    Подавленные повторы сообщаются одной сводкой по истечении окна.
+    Число ключей ограничено: давно не встречавшиеся вытесняются.
+    """
+
+    def __init__(self, window=ERROR_WINDOW, max_keys=ERROR_MAX_KEYS,
+                 clock=time.monotonic):
+        self.window = window
+        self.max_keys = max_keys
+        self.clock = clock
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def key(error, scope=None):
+        """Ключ ошибки."""
+        return scope, type(error).__name__, normalise(str(error))
+
+    def summary(self, entry, count):
+        """Текст сводки о повторах ошибки."""
+        return (f'Ошибка повторилась ×{count} за '
+                f'{format_window(self.window)}: {entry.message}')
+
+    def report(self, error, message, scope=None):
+        """Учёт ошибки. Возвращает текст для отправки или None,
+        если ошибка уже сообщалась в текущем окне.
+        """
+        key = self.key(error, scope)
+        now = self.clock()
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = Entry(message, now)
+            while len(self.entries) > self.max_keys:
+                self.entries.popitem(last=False)
+            return message
+        self.entries.move_to_end(key)
+        entry.message = message
+        if now - entry.sent_at < self.window:
+            entry.repeats += 1
+            return None
+        count, entry.repeats, entry.sent_at = entry.repeats + 1, 0, now
+        return self.summary(entry, count) if count > 1 else message
+
+    def forget(self, error, scope=None):
+        """Сброс ошибки, например после неудачной отправки,
+        чтобы она была сообщена при следующем появлении.
+        """
+        self.entries.pop(self.key(error, scope), None)
+
+    def summaries(self):
+        """Сводки по ошибкам с истёкшим окном: список пар
+        (область, текст). Ошибки без повторов забываются.
+        """
+        now = self.clock()
+        result = []
+        for key, entry in list(self.entries.items()):
+            if now - entry.sent_at < self.window:
+                continue
+            if entry.repeats:
+                result.append((key[0], self.summary(entry, entry.repeats)))
+                entry.repeats, entry.sent_at = 0, now
+            else:
+                del self.entries[key]
+        return result
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,169 @@
+from abc import ABC, abstractmethod
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def make_homeworks(count, seed=0):
+    """Синтетический список работ в формате API Практикума."""
+    generator = random.Random(seed)
+    return [
+        {
+            'id': number,
+            'homework_name': f'student__hw{number}.zip',
+            'status': generator.choice(STATUSES),
+            'reviewer_comment': 'Комментарий ревьюера',
+            'date_updated': '2021-04-11T10:31:09Z',
+            'lesson_name': 'Проект спринта',
+        }
+        for number in range(count)
+    ]
+
+
+class FakeServer(ABC):
+    """Локальный HTTP-сервер в фоновом потоке с задержкой и ошибками."""
+
+    error_body = {'detail': 'Internal Server Error'}
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                          self.handler_class())
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    @property
+    def url(self):
+        """Адрес сервера."""
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def handler_class(self):
+        """Класс обработчика запросов, привязанный к серверу."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+            wbufsize = 1 << 16
+
+            def do_GET(self):
+                fake.dispatch(self)
+
+            def do_POST(self):
+                fake.dispatch(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def dispatch(self, handler):
+        """Задержка, случайная ошибка или ответ сервера."""
+        self.requests += 1
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+        if self.latency:
+            time.sleep(self.latency)
+        if self.random.random() < self.error_rate:
+            self.reply(handler, 500, self.error_body)
+            return
+        status, data = self.respond(handler, body)
+        self.reply(handler, status, data)
+
+    @abstractmethod
+    def respond(self, handler, body):
+        """Статус и тело ответа."""
+
+    def reply(self, handler, status, data):
+        """Отправка JSON-ответа."""
+        payload = json.dumps(data).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakePracticum(FakeServer):
+    """Заглушка эндпоинта homework_statuses."""
+
+    path = '/api/user_api/homework_statuses/'
+
+    def __init__(self, payload_size=1, **kwargs):
+        super().__init__(**kwargs)
+        self.homeworks = make_homeworks(payload_size)
+
+    @property
+    def endpoint(self):
+        """Адрес эндпоинта для homework.ENDPOINT."""
+        return self.url + self.path
+
+    def respond(self, handler, body):
+        """Ответ со списком работ или 401 без токена."""
+        url = urlparse(handler.path)
+        if not handler.headers.get('Authorization', '').startswith('OAuth '):
+            return 401, {'code': 'not_authenticated'}
+        if url.path != self.path or 'from_date' not in parse_qs(url.query):
+            return 400, {'code': 'UnknownError'}
+        return 200, {'homeworks': self.homeworks,
+                     'current_date': int(time.time())}
+
+
+class FakeTelegram(FakeServer):
+    """Заглушка Telegram Bot API (sendMessage и getMe)."""
+
+    error_body = {'ok': False, 'error_code': 500,
+                  'description': 'Internal Server Error'}
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.messages = []
+
+    @property
+    def api_url(self):
+        """Шаблон адреса для telebot.apihelper.API_URL."""
+        return self.url + '/bot{0}/{1}'
+
+    def respond(self, handler, body):
+        """Ответ Bot API в формате {"ok": true, "result": ...}."""
+        method = urlparse(handler.path).path.rsplit('/', 1)[-1]
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'bot',
+                'username': 'homework_bot'}}
+        if method != 'sendMessage':
+            return 404, {'ok': False, 'error_code': 404,
+                         'description': 'Not Found'}
+        params = self.params(handler, body)
+        self.messages.append(params)
+        return 200, {'ok': True, 'result': {
+            'message_id': len(self.messages),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'text': params.get('text', ''),
+        }}
+
+    @staticmethod
+    def params(handler, body):
+        """Параметры запроса из строки запроса, формы или JSON."""
+        if handler.headers.get('Content-Type', '').startswith(
+                'application/json'):
+            return json.loads(body or b'{}')
+        query = urlparse(handler.path).query or body.decode()
+        return {key: values[0] for key, values in parse_qs(query).items()}
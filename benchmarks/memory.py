@@ -0,0 +1,100 @@
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from benchmarks.fake_servers import make_homeworks
+from engine import Engine, Tenant
+from homework import parse_status
+
+
+def fresh_homeworks(count, seed):
+    """Работы с новыми строками дат, как после разбора ответа API."""
+    return [dict(homework, date_updated=homework['date_updated'][:-1] + 'Z')
+            for homework in make_homeworks(count, seed)]
+
+
+def build_naive(tenants, homeworks):
+    """Прежнее представление: словарь на арендатора с from_date,
+    готовым текстом последнего сообщения и парами (status, date_updated).
+    """
+    state = {}
+    for number, tenant in enumerate(tenants):
+        works = fresh_homeworks(homeworks, number)
+        state[tenant.key] = {
+            'timestamp': 1000000000 + number,
+            'last_message': parse_status(works[0]),
+            'states': {work['id']: (work['status'], work['date_updated'])
+                       for work in works},
+        }
+    return state
+
+
+def build_compact(tenants, homeworks):
+    """Компактное представление движка: запись TenantState со слотами,
+    снимок с состояниями-числами и планировщик.
+    """
+    engine = Engine(tenants, '1234:abcdefg')
+    for number, tenant in enumerate(tenants):
+        engine.set_timestamp(tenant, 1000000000 + number)
+        engine.get_scheduler(tenant)
+        snapshot = engine.get_snapshot(tenant)
+        for event in snapshot.diff(fresh_homeworks(homeworks, number)):
+            snapshot.commit(event)
+    return engine
+
+
+def measure(build, tenants, homeworks):
+    """Память, которую удерживает построенное состояние, в байтах."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        state = build(tenants, homeworks)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del state
+    return used
+
+
+def run(sizes=(10000, 100000), homeworks=3):
+    """Сравнение памяти прежнего и компактного представлений."""
+    results = []
+    for size in sizes:
+        tenants = [Tenant(f'token-{number}', 1000 + number)
+                   for number in range(size)]
+        row = {'tenants': size, 'homeworks': homeworks}
+        for name, build in (('naive', build_naive),
+                            ('compact', build_compact)):
+            used = measure(build, tenants, homeworks)
+            row[f'{name}_mb'] = round(used / 2 ** 20, 2)
+            row[f'{name}_bytes_per_tenant'] = round(used / size)
+        row['saving'] = round(1 - row['compact_mb'] / row['naive_mb'], 3)
+        results.append(row)
+    return {'results': results}
+
+
+def main(argv=None):
+    """Запуск бенчмарка из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Бенчмарк памяти на состояние арендаторов')
+    parser.add_argument('--tenants', type=int, nargs='+',
+                        default=[10000, 100000])
+    parser.add_argument('--homeworks', type=int, default=3,
+                        help='число работ у арендатора')
+    parser.add_argument('--output', help='файл для JSON-результата')
+    args = parser.parse_args(argv)
+    result = run(args.tenants, args.homeworks)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from benchmarks.fake_servers import FakePracticum, FakeTelegram
+
+STAGES = ('get_api_answer', 'check_response', 'parse_status', 'send_message')
+
+
+def summary(samples, elapsed):
+    """Пропускная способность и квантили задержки этапа в мс."""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    return {
+        'count': len(samples),
+        'throughput_per_s': round(len(samples) / elapsed, 2),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+        'p50_ms': round(ordered[int(0.5 * (len(ordered) - 1))] * 1000, 3),
+        'p99_ms': round(ordered[int(0.99 * (len(ordered) - 1))] * 1000, 3),
+    }
+
+
+def run(iterations=100, latency=0.0, error_rate=0.0, payload_size=1,
+        send_limit=1):
+    """Прогон реального конвейера homework.py против локальных заглушек.
+    В каждой итерации выполняются get_api_answer, check_response,
+    parse_status для каждой работы и send_message для первых send_limit
+    сообщений. Возвращает словарь с результатами по этапам.
+    """
+    import homework
+    import transport
+    from telebot import TeleBot, apihelper  # type: ignore
+
+    samples = {stage: [] for stage in STAGES}
+    errors = {stage: 0 for stage in STAGES}
+    practicum = FakePracticum(payload_size=payload_size, latency=latency,
+                              error_rate=error_rate)
+    telegram = FakeTelegram(latency=latency, error_rate=error_rate, seed=1)
+    saved = (homework.ENDPOINT, homework.HEADERS, homework.TELEGRAM_CHAT_ID,
+             apihelper.API_URL, apihelper.session)
+    with practicum, telegram:
+        homework.ENDPOINT = practicum.endpoint
+        homework.HEADERS = {'Authorization': 'OAuth benchmark'}
+        homework.TELEGRAM_CHAT_ID = '1'
+        apihelper.API_URL = telegram.api_url
+        transport.configure_telebot(transport.build_session())
+        bot = TeleBot(token='1:benchmark')
+
+        def measure(stage, function, *args):
+            started = time.perf_counter()
+            try:
+                result = function(*args)
+            except Exception:
+                errors[stage] += 1
+                raise
+            finally:
+                samples[stage].append(time.perf_counter() - started)
+            if result is False:
+                errors[stage] += 1
+            return result
+
+        started = time.perf_counter()
+        try:
+            for _ in range(iterations):
+                try:
+                    response = measure('get_api_answer',
+                                       homework.get_api_answer, 0)
+                    homeworks = measure('check_response',
+                                        homework.check_response, response)
+                    messages = [measure('parse_status', homework.parse_status,
+                                        item) for item in homeworks]
+                except Exception:
+                    continue
+                for message in messages[:send_limit]:
+                    measure('send_message', homework.send_message, bot,
+                            message)
+        finally:
+            elapsed = time.perf_counter() - started
+            (homework.ENDPOINT, homework.HEADERS, homework.TELEGRAM_CHAT_ID,
+             apihelper.API_URL, apihelper.session) = saved
+    return {
+        'parameters': {
+            'iterations': iterations, 'latency_s': latency,
+            'error_rate': error_rate, 'payload_size': payload_size,
+            'send_limit': send_limit,
+        },
+        'elapsed_s': round(elapsed, 3),
+        'cycles_per_s': round(iterations / elapsed, 2),
+        'stages': {stage: dict(summary(samples[stage], elapsed),
+                               errors=errors[stage]) for stage in STAGES},
+    }
+
+
+def main(argv=None):
+    """Запуск бенчмарка из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Бенчмарк конвейера homework.py на локальных заглушках')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='задержка заглушек, секунды')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='доля ответов 500')
+    parser.add_argument('--payload-size', type=int, default=1,
+                        help='число работ в ответе API')
+    parser.add_argument('--send-limit', type=int, default=1,
+                        help='сообщений в Telegram за итерацию')
+    parser.add_argument('--output', help='файл для JSON-результата')
+    args = parser.parse_args(argv)
+    result = run(args.iterations, args.latency, args.error_rate,
+                 args.payload_size, args.send_limit)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
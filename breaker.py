@@ -0,0 +1,84 @@
+import logging
+import os
+import time
+
+import metrics
+
+FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 60))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+CIRCUIT_OPENED = metrics.REGISTRY.counter(
+    'homework_circuit_opened_total', 'Срабатывания предохранителей')
+
+
+class CircuitBreaker:
+    """Предохранитель вызовов внешнего сервиса.
+    После failure_threshold сбоев подряд размыкается, и вызовы
+    пропускаются reset_timeout секунд. Затем пропускается один пробный
+    вызов: успех замыкает предохранитель, сбой снова размыкает.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+
+    @property
+    def remaining(self):
+        """Сколько секунд осталось до пробного вызова."""
+        started = (self.opened_at if self.probe_started is None
+                   else self.probe_started)
+        if started is None:
+            return 0
+        return max(started + self.reset_timeout - self.clock(), 0)
+
+    def allow(self):
+        """Можно ли выполнить вызов сейчас.
+        В полуоткрытом состоянии пропускается один пробный вызов;
+        если он не сообщил результат за reset_timeout, — следующий.
+        """
+        if self.state == CLOSED:
+            return True
+        if self.remaining > 0:
+            return False
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+            logging.info(f'Предохранитель {self.name}: пробный вызов')
+        self.probe_started = self.clock()
+        return True
+
+    def success(self):
+        """Учёт успешного вызова."""
+        if self.state != CLOSED:
+            logging.info(f'Предохранитель {self.name} замкнут')
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = self.probe_started = None
+
+    def failure(self):
+        """Учёт сбоя вызова."""
+        self.failures += 1
+        if self.state == HALF_OPEN or (
+                self.state == CLOSED
+                and self.failures >= self.failure_threshold):
+            self.open()
+
+    def open(self):
+        """Размыкание предохранителя."""
+        if self.state != OPEN:
+            CIRCUIT_OPENED.inc(self.name)
+            logging.warning(f'Предохранитель {self.name} разомкнут '
+                            f'на {self.reset_timeout} с')
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.probe_started = None
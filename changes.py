@@ -0,0 +1,173 @@
+import functools
+import os
+import zlib
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from verdicts import HOMEWORK_VERDICTS
+
+DATE_CACHE_SIZE = 4096
+SYNC_OVERLAP = int(os.getenv('SYNC_OVERLAP', 300))
+SEEN_SIZE = int(os.getenv('SEEN_SIZE', 100000))
+
+Event = namedtuple('Event', ('key', 'state', 'homework'))
+STATUS_CODES = tuple(HOMEWORK_VERDICTS)
+
+
+def homework_key(homework):
+    """Идентификатор работы: id, а для ответов без id — её название."""
+    return homework.get('id', homework.get('homework_name'))
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def iso_timestamp(value):
+    """Дата в формате ISO 8601 в секундах эпохи.
+    Суффикс Z заменяется на +00:00: до Python 3.11 fromisoformat
+    его не понимает.
+    """
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def parse_date(value):
+    """date_updated в секундах эпохи.
+    Нераспознанная дата заменяется отрицательной контрольной суммой,
+    чтобы разные значения по-прежнему различались.
+    """
+    if isinstance(value, str):
+        try:
+            return iso_timestamp(value)
+        except ValueError:
+            pass
+    return -zlib.crc32(str(value).encode()) - 1
+
+
+def encode_state(homework):
+    """Состояние работы одним целым числом: дата обновления и код
+    статуса. Неизвестный статус получает код len(HOMEWORK_VERDICTS).
+    """
+    codes = STATUS_CODES
+    status = homework.get('status')
+    code = codes.index(status) if status in codes else len(codes)
+    return parse_date(homework.get('date_updated')) * (len(codes) + 1) + code
+
+
+def decode_state(state):
+    """Пара (status, date_updated в секундах) из состояния работы."""
+    codes = STATUS_CODES
+    date, code = divmod(state, len(codes) + 1)
+    return (codes[code] if code < len(codes) else None), date
+
+
+def query_from(timestamp, overlap=SYNC_OVERLAP):
+    """from_date запроса с перекрытием: обновления, попавшие на стык
+    времени сервера и нашего запроса, придут повторно и отсеются.
+    """
+    return max(timestamp - overlap, 0)
+
+
+def resume_from(timestamp, current_date, failed=()):
+    """from_date следующего запроса после обработки ответа.
+    Если часть событий не доставлена, окно начинается с самого раннего
+    из них, а не с прежнего from_date.
+    """
+    dates = [decode_state(event.state)[1] for event in failed]
+    if any(date < 0 for date in dates):
+        return timestamp
+    return min([current_date, *dates])
+
+
+class SeenSet:
+    """Ограниченное множество уже обработанных событий
+    (область, id, состояние) с вытеснением самых старых.
+    """
+
+    __slots__ = ('items', 'size')
+
+    def __init__(self, size=SEEN_SIZE):
+        self.items = OrderedDict()
+        self.size = size
+
+    def add(self, item):
+        """Добавление события."""
+        self.items[item] = None
+        self.items.move_to_end(item)
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def discard(self, item):
+        """Удаление события."""
+        self.items.pop(item, None)
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
+class Snapshot:
+    """Последнее известное состояние работ арендатора.
+    Индексирует работы по id и хранит состояние одним целым числом
+    (см. encode_state): тексты сообщений в памяти не держатся.
+    Необязательное общее множество seen отсеивает события, которые
+    уже обрабатывались, даже если снимок помнит более новое состояние.
+    """
+
+    __slots__ = ('states', 'seen', 'scope')
+
+    def __init__(self, seen=None, scope=None):
+        self.states = {}
+        self.seen = seen
+        self.scope = scope
+
+    def diff(self, homeworks):
+        """События по работам, состояние которых изменилось.
+        Выполняется за один проход по списку. API отдаёт работы от новых
+        к старым, поэтому события возвращаются в хронологическом порядке.
+        Снимок не меняется, пока событие не подтверждено через commit().
+        """
+        events = []
+        found = set()
+        for homework in reversed(homeworks):
+            event = self.changed(homework)
+            if event and (event.key, event.state) not in found:
+                found.add((event.key, event.state))
+                events.append(event)
+        return events
+
+    def changed(self, homework):
+        """Событие по одной работе или None, если она не изменилась."""
+        if not isinstance(homework, dict):
+            raise TypeError(
+                'Ожидается словарь homeworks, но получен другой тип данных'
+            )
+        key = homework_key(homework)
+        state = encode_state(homework)
+        if self.states.get(key) == state:
+            return None
+        if self.seen is not None and (self.scope, key, state) in self.seen:
+            return None
+        return Event(key, state, homework)
+
+    def commit(self, event):
+        """Фиксация доставленного события в снимке."""
+        self.states[event.key] = event.state
+        if self.seen is not None:
+            self.seen.add((self.scope, event.key, event.state))
+
+    def discard(self, event):
+        """Откат события, доставка которого не удалась."""
+        if self.states.get(event.key) == event.state:
+            del self.states[event.key]
+        if self.seen is not None:
+            self.seen.discard((self.scope, event.key, event.state))
+
+    def reviewing(self):
+        """Есть ли среди известных работ работа на проверке."""
+        return any(decode_state(state)[0] == 'reviewing'
+                   for state in self.states.values())
+
+    def __len__(self):
+        return len(self.states)
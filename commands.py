@@ -0,0 +1,146 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from changes import homework_key
+from verdicts import HOMEWORK_VERDICTS
+
+BOT_COMMANDS = os.getenv('BOT_COMMANDS', 'false').lower() in ('1', 'true')
+STATUS_CACHE_SIZE = int(os.getenv('STATUS_CACHE_SIZE', 10000))
+HISTORY_LIMIT = int(os.getenv('HISTORY_LIMIT', 10))
+COMMANDS = ('status', 'history', 'pending')
+PENDING_STATUS = 'reviewing'
+
+
+def format_date(value):
+    """Дата обновления для ответа: без секунд и зоны."""
+    if isinstance(value, str) and len(value) >= 16:
+        return value[:16].replace('T', ' ')
+    return str(value)
+
+
+def verdict(status):
+    """Текст вердикта по статусу."""
+    return HOMEWORK_VERDICTS.get(status, status)
+
+
+class StatusCache:
+    """Последние результаты check_response по арендаторам.
+    Недавно обновлявшиеся арендаторы хранятся в памяти (не больше size),
+    остальные читаются из StateStore, куда записывается каждая смена
+    статуса. История берётся из журналов histories (history.HistoryLog
+    или HistoryReader). Ответы на команды не обращаются к API Практикума.
+    """
+
+    def __init__(self, store, size=STATUS_CACHE_SIZE, histories=()):
+        self.store = store
+        self.size = size
+        self.histories = list(histories)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def update(self, tenant, homeworks):
+        """Учёт работ из ответа API: сохраняются только изменения.
+        Изменения записываются в хранилище после снятия блокировки,
+        чтобы ответы на команды не ждали записи на диск.
+        """
+        changed = []
+        with self.lock:
+            current = self.entries.pop(tenant, None)
+            if current is None:
+                current = {row[0]: row[1:]
+                           for row in self.store.load_statuses(tenant)}
+            for homework in homeworks:
+                if not isinstance(homework, dict):
+                    continue
+                key = str(homework_key(homework))
+                record = (homework.get('homework_name'),
+                          homework.get('status'),
+                          homework.get('date_updated'))
+                if current.get(key) != record:
+                    current[key] = record
+                    changed.append((key, record))
+            self.entries[tenant] = current
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        for key, record in changed:
+            self.store.set_status(tenant, key, *record)
+
+    def statuses(self, tenant):
+        """Работы арендатора: список (name, status, updated)."""
+        with self.lock:
+            current = self.entries.get(tenant)
+            if current is not None:
+                return list(current.values())
+        return [row[1:] for row in self.store.load_statuses(tenant)]
+
+    def history(self, tenant):
+        """Ответ на /history: последние смены статусов из журналов."""
+        if not self.histories:
+            return 'История недоступна.'
+        records = []
+        for log in self.histories:
+            records += log.query(tenant, limit=HISTORY_LIMIT)
+        if not records:
+            return 'История проверок пуста.'
+        records.sort(key=lambda record: record['logged_at'])
+        return 'История проверок:\n' + '\n'.join(
+            f'{format_date(record["date_updated"])} {record["name"]} — '
+            f'{verdict(record["status"])}'
+            for record in records[-HISTORY_LIMIT:])
+
+    def answer(self, tenant, command):
+        """Текст ответа на команду."""
+        if tenant is None:
+            return 'Для этого чата нет отслеживаемых работ.'
+        if command == 'history':
+            return self.history(tenant)
+        rows = sorted(self.statuses(tenant), key=lambda row: str(row[2]))
+        if command == 'pending':
+            rows = [row for row in rows if row[1] == PENDING_STATUS]
+            if not rows:
+                return 'Работ на проверке нет.'
+            return 'На проверке:\n' + '\n'.join(
+                f'• {name} (с {format_date(updated)})'
+                for name, _, updated in rows)
+        if not rows:
+            return 'Работ пока нет.'
+        return 'Статусы работ:\n' + '\n'.join(
+            f'• {name} — {verdict(status)} ({format_date(updated)})'
+            for name, status, updated in rows)
+
+
+def parse_command(text):
+    """Имя команды из текста сообщения: '/status@bot' -> 'status'."""
+    if not text or not text.startswith('/'):
+        return None
+    return text.split()[0][1:].split('@')[0].lower()
+
+
+def register(bot, cache, chats):
+    """Обработчики команд TeleBot. chats — соответствие
+    идентификатора чата (строкой) ключу арендатора.
+    """
+
+    @bot.message_handler(commands=list(COMMANDS))
+    def answer(message):
+        chat_id = message.chat.id
+        text = cache.answer(chats.get(str(chat_id)),
+                            parse_command(message.text))
+        try:
+            bot.send_message(chat_id, text)
+        except Exception as error:
+            logging.error(f'Ошибка ответа на команду: {error}')
+
+    return answer
+
+
+def start_polling(bot):
+    """Приём команд long polling в фоновом потоке."""
+    thread = threading.Thread(
+        target=bot.infinity_polling, daemon=True, name='bot-commands',
+        kwargs={'allowed_updates': ['message']})
+    thread.start()
+    logging.info('Приём команд Telegram запущен')
+    return thread
@@ -0,0 +1,176 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import threading
+
+from dotenv import dotenv_values  # type: ignore
+
+ENV_FILE = os.getenv('ENV_FILE', '.env')
+CONFIG_RELOAD = os.getenv('CONFIG_RELOAD', 'true').lower() in ('1', 'true')
+CONFIG_POLL_INTERVAL = float(os.getenv('CONFIG_POLL_INTERVAL', 2))
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def read_env(path=ENV_FILE):
+    """Переменные окружения процесса, поверх которых лежат значения
+    из файла path. В отличие от load_dotenv, файл важнее окружения:
+    именно в нём меняют токены без перезапуска.
+    """
+    values = dict(os.environ)
+    if os.path.exists(path):
+        values.update((name, value) for name, value
+                      in dotenv_values(path).items() if value is not None)
+    return values
+
+
+def signature(path):
+    """Версия файла: inode, размер и время изменения; None без файла."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class Inotify:
+    """Минимальная обёртка inotify(7) через ctypes."""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def watch(self, directory):
+        """Подписка на создание, запись и переименование в каталоге."""
+        if self.libc.inotify_add_watch(
+                self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), directory)
+
+    def wait(self, timeout, wakeup=None):
+        """Ожидание событий не дольше timeout или до записи в wakeup;
+        True, если события были.
+        """
+        watched = [self.fd] if wakeup is None else [self.fd, wakeup]
+        ready, _, _ = select.select(watched, [], [], timeout)
+        if self.fd not in ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        """Закрытие дескриптора inotify."""
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Слежение за файлами конфигурации в фоновом потоке.
+    На Linux изменения приходят через inotify: подписка идёт на каталоги
+    файлов, чтобы замечать и атомарную замену через rename. Без inotify
+    файлы опрашиваются раз в interval секунд. Изменившимся считается
+    файл с другими inode, размером или mtime. Пути изменившихся файлов
+    копятся до вызова take(); если передан callback, он вызывается
+    со списком путей из потока наблюдения.
+    """
+
+    def __init__(self, paths, callback=None, interval=CONFIG_POLL_INTERVAL,
+                 use_inotify=True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.callback = callback
+        self.interval = interval
+        self.signatures = {path: signature(path) for path in self.paths}
+        self.changed = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.inotify = self.open_inotify() if use_inotify else None
+        self.wakeup = os.pipe() if self.inotify else None
+
+    def open_inotify(self):
+        """inotify для каталогов файлов или None, если он недоступен."""
+        try:
+            inotify = Inotify()
+        except (OSError, AttributeError) as error:
+            logging.info(f'inotify недоступен, файлы опрашиваются: {error}')
+            return None
+        try:
+            for directory in {os.path.dirname(path) for path in self.paths}:
+                inotify.watch(directory)
+        except OSError as error:
+            inotify.close()
+            logging.info(f'inotify недоступен, файлы опрашиваются: {error}')
+            return None
+        return inotify
+
+    def check(self):
+        """Сравнение версий файлов. Возвращает изменившиеся пути."""
+        changed = []
+        for path in self.paths:
+            current = signature(path)
+            if current != self.signatures[path]:
+                self.signatures[path] = current
+                changed.append(path)
+        if not changed:
+            return changed
+        with self.lock:
+            self.changed.update(changed)
+        if self.callback is not None:
+            try:
+                self.callback(changed)
+            except Exception as error:
+                logging.error(f'Ошибка применения конфигурации: {error}')
+        return changed
+
+    def take(self):
+        """Изменившиеся с прошлого вызова пути."""
+        with self.lock:
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def run(self):
+        """Цикл наблюдения до вызова stop()."""
+        while not self.stopped.is_set():
+            if self.inotify is None:
+                self.stopped.wait(self.interval)
+            else:
+                self.inotify.wait(self.interval, self.wakeup[0])
+            if not self.stopped.is_set():
+                self.check()
+
+    def start(self):
+        """Запуск наблюдения в фоновом потоке."""
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       name='config-watcher')
+        self.thread.start()
+        logging.info('Наблюдение за конфигурацией: '
+                     + ('inotify' if self.inotify else 'опрос'))
+        return self
+
+    def stop(self):
+        """Остановка наблюдения."""
+        self.stopped.set()
+        if self.wakeup is not None:
+            os.write(self.wakeup[1], b'\0')
+        if self.thread is not None:
+            self.thread.join()
+        if self.inotify is not None:
+            self.inotify.close()
+            for fd in self.wakeup:
+                os.close(fd)
+            self.inotify = self.wakeup = None
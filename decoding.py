@@ -0,0 +1,168 @@
+import codecs
+import json
+import os
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+JSON_DECODER = os.getenv('JSON_DECODER', 'auto')
+WHITESPACE = ' \t\n\r'
+DELIMITERS = WHITESPACE + ',]}'
+
+
+def get_loads(name=JSON_DECODER):
+    """Функция разбора JSON: orjson, если он установлен, иначе json."""
+    if name == 'orjson' or (name == 'auto' and orjson is not None):
+        if orjson is None:
+            raise ImportError('Декодер orjson не установлен')
+        return orjson.loads
+    return json.loads
+
+
+loads = get_loads()
+
+
+class HomeworkStream:
+    """Потоковый разбор ответа API.
+    Тело подаётся кусками через feed(), работы из массива homeworks
+    возвращаются по одной, как только полностью получены, поэтому
+    в памяти не держится весь массив. Остальные ключи верхнего уровня
+    (current_date) собираются в fields.
+    """
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.state = 'start'
+        self.key = None
+        self.fields = {}
+        self.has_homeworks = False
+
+    def skip(self, position, separators=''):
+        """Пропуск пробелов и разделителей."""
+        while (position < len(self.buffer)
+               and self.buffer[position] in WHITESPACE + separators):
+            position += 1
+        return position
+
+    def decode(self, position, final):
+        """Разбор одного значения. None, если данных пока не хватает."""
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, position)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        number = isinstance(value, (int, float)) and not isinstance(value,
+                                                                    bool)
+        if number and not final and (end == len(self.buffer)
+                                     or self.buffer[end] not in DELIMITERS):
+            return None
+        return value, end
+
+    def feed(self, chunk, final=False):
+        """Передача очередного куска тела. Возвращает готовые работы."""
+        self.buffer += self.text.decode(chunk, final)
+        items = []
+        position = 0
+        while True:
+            position = self.skip(position,
+                                 '' if self.state == 'colon' else ',')
+            if position >= len(self.buffer):
+                break
+            step = getattr(self, f'read_{self.state}')
+            next_position = step(position, final, items)
+            if next_position is None:
+                break
+            position = next_position
+        self.buffer = self.buffer[position:]
+        if final:
+            self.close()
+        return items
+
+    def read_start(self, position, final, items):
+        """Начало ответа: ожидается словарь."""
+        if self.buffer[position] != '{':
+            raise TypeError('Ожидается словарь response, '
+                            'но получен другой тип данных')
+        self.state = 'key'
+        return position + 1
+
+    def read_key(self, position, final, items):
+        """Ключ верхнего уровня или конец словаря."""
+        if self.buffer[position] == '}':
+            self.state = 'done'
+            return position + 1
+        decoded = self.decode(position, final)
+        if decoded is None:
+            return None
+        self.key, position = decoded
+        self.state = 'colon'
+        return position
+
+    def read_colon(self, position, final, items):
+        """Двоеточие между ключом и значением."""
+        if self.buffer[position] != ':':
+            raise ValueError('Некорректный JSON в ответе API')
+        self.state = 'value'
+        return position + 1
+
+    def read_value(self, position, final, items):
+        """Значение ключа; для homeworks — начало массива."""
+        if self.key == 'homeworks':
+            if self.buffer[position] != '[':
+                raise TypeError('Ожидается список homeworks, '
+                                'но получен другой тип данных')
+            self.has_homeworks = True
+            self.state = 'items'
+            return position + 1
+        decoded = self.decode(position, final)
+        if decoded is None:
+            return None
+        self.fields[self.key], position = decoded
+        self.state = 'key'
+        return position
+
+    def read_items(self, position, final, items):
+        """Очередная работа из массива homeworks."""
+        if self.buffer[position] == ']':
+            self.state = 'key'
+            return position + 1
+        decoded = self.decode(position, final)
+        if decoded is None:
+            return None
+        homework, position = decoded
+        items.append(homework)
+        return position
+
+    def read_done(self, position, final, items):
+        """Данные после конца ответа."""
+        raise ValueError('Лишние данные после конца ответа API')
+
+    def close(self):
+        """Проверка, что ответ получен целиком и содержит homeworks."""
+        if self.state != 'done':
+            raise ValueError('Ответ API оборван')
+        if not self.has_homeworks:
+            raise KeyError("'homeworks' Нет ключа homeworks в ответe")
+
+
+def iter_homeworks(chunks, stream=None):
+    """Работы из ответа API, поданного итерируемым набором кусков."""
+    stream = stream or HomeworkStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.feed(b'', final=True)
+
+
+async def aiter_homeworks(chunks, stream=None):
+    """Асинхронный вариант iter_homeworks для httpx.Response.aiter_bytes."""
+    stream = stream or HomeworkStream()
+    async for chunk in chunks:
+        for homework in stream.feed(chunk):
+            yield homework
+    for homework in stream.feed(b'', final=True):
+        yield homework
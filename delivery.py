@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from exceptions import CircuitOpen, RetryLater
+
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', 16))
+MAX_ATTEMPTS = int(os.getenv('DELIVERY_MAX_ATTEMPTS', 5))
+RECIPIENT_BACKOFF = float(os.getenv('RECIPIENT_BACKOFF', 60))
+RECIPIENT_MAX_BACKOFF = float(os.getenv('RECIPIENT_MAX_BACKOFF', 3600))
+RECIPIENT_MAX_FAILURES = int(os.getenv('RECIPIENT_MAX_FAILURES', 5))
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, запас capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Занять токен. Возвращает паузу, после которой он будет готов."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def delay(self):
+        """Пауза до готовности токена без его траты."""
+        elapsed = time.monotonic() - self.updated
+        tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        return 0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    async def acquire(self):
+        """Дождаться токена."""
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """Запретить выдачу токенов на seconds секунд."""
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+    @property
+    def idle(self):
+        """Запас полон, и ведро можно забыть без потери ограничения."""
+        elapsed = time.monotonic() - self.updated
+        return self.tokens + elapsed * self.rate >= self.capacity
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений в Telegram.
+    Воркеры разбирают очередь параллельно, соблюдая общий лимит
+    Telegram и лимит на каждый чат. Ответ 429 откладывает сообщение
+    на retry_after секунд вместо того, чтобы его потерять. Сообщения
+    в чат, который ещё не готов принять следующее, откладываются вместе
+    с его очередью, а не занимают воркер ожиданием, поэтому медленный
+    чат не задерживает остальные; порядок сообщений в чате сохраняется.
+    """
+
+    def __init__(self, workers=DELIVERY_WORKERS, global_rate=GLOBAL_RATE,
+                 chat_rate=CHAT_RATE, max_attempts=MAX_ATTEMPTS):
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_attempts = max_attempts
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_buckets = {}
+        self.queue = asyncio.Queue()
+        self.tasks = []
+        self.waiting = {}
+        self.timers = {}
+
+    def put(self, chat_id, text):
+        """Поставить сообщение в очередь.
+        Возвращает future с результатом доставки (True или False).
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((chat_id, text, future, 1))
+        return future
+
+    def chat_bucket(self, chat_id):
+        """Ограничитель частоты для чата."""
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) > 10 * self.workers + 1000:
+                self.chat_buckets = {
+                    key: value for key, value in self.chat_buckets.items()
+                    if not value.idle
+                }
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return bucket
+
+    def defer(self, item, delay):
+        """Откладывание сообщения до готовности чата.
+        Сообщение остаётся незавершённым для join() до возврата в очередь.
+        """
+        chat_id = item[0]
+        waiting = self.waiting.get(chat_id)
+        if waiting is None:
+            waiting = self.waiting[chat_id] = deque()
+            self.timers[chat_id] = asyncio.get_running_loop().call_later(
+                delay, self.resume, chat_id)
+        waiting.append(item)
+
+    def resume(self, chat_id):
+        """Возврат отложенных сообщений чата в очередь по порядку."""
+        self.timers.pop(chat_id, None)
+        for item in self.waiting.pop(chat_id, ()):
+            self.queue.put_nowait(item)
+            self.queue.task_done()
+
+    async def worker(self, send):
+        """Воркер: отправка сообщений из очереди."""
+        while True:
+            item = await self.queue.get()
+            chat_id, text, future, attempt = item
+            bucket = self.chat_bucket(chat_id)
+            if chat_id in self.waiting or bucket.delay():
+                self.defer(item, bucket.delay())
+                continue
+            try:
+                await bucket.acquire()
+                await self.global_bucket.acquire()
+                result = await self.send_held(send, chat_id, text)
+            except RetryLater as error:
+                retry_after = error.retry_after or 1
+                logging.warning(f'Telegram просит подождать {retry_after} с '
+                                f'перед отправкой в чат {chat_id}')
+                self.chat_bucket(chat_id).pause(retry_after)
+                if attempt < self.max_attempts:
+                    self.queue.put_nowait((chat_id, text, future,
+                                           attempt + 1))
+                    continue
+                result = False
+            except Exception as error:
+                logging.error(f'Неожиданная ошибка отправки сообщения: '
+                              f'{error}')
+                result = False
+            finally:
+                self.queue.task_done()
+            if not future.done():
+                future.set_result(result)
+
+    async def send_held(self, send, chat_id, text):
+        """Отправка, придержанная на время, пока разомкнут предохранитель
+        Telegram. Сообщение не теряется и не тратит попытки.
+        """
+        while True:
+            try:
+                return await send(chat_id, text)
+            except CircuitOpen as error:
+                await asyncio.sleep(error.retry_after or 1)
+
+    def start(self, send):
+        """Запуск воркеров. send — корутина send(chat_id, text)."""
+        self.tasks = [asyncio.create_task(self.worker(send))
+                      for _ in range(self.workers)]
+
+    async def join(self):
+        """Дождаться доставки всех сообщений из очереди."""
+        await self.queue.join()
+
+    async def stop(self):
+        """Остановка воркеров."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers = {}
+
+    def __len__(self):
+        return self.queue.qsize() + sum(map(len, self.waiting.values()))
+
+
+class RecipientBackoff:
+    """Пауза перед новой попыткой доставки получателю после неудач.
+    Пауза удваивается с каждой неудачей подряд (от base до maximum),
+    так что заблокированный или недоступный чат не получает попыток
+    каждый цикл опроса. После limit неудач подряд получатель считается
+    недоступным (exhausted) до первой успешной доставки. Хранятся только
+    получатели с неудачами.
+    """
+
+    def __init__(self, base=RECIPIENT_BACKOFF,
+                 maximum=RECIPIENT_MAX_BACKOFF, clock=time.monotonic,
+                 limit=RECIPIENT_MAX_FAILURES):
+        self.base = base
+        self.maximum = maximum
+        self.clock = clock
+        self.limit = limit
+        self.entries = {}
+
+    def ready(self, key):
+        """Можно ли пробовать доставку получателю key."""
+        entry = self.entries.get(key)
+        return entry is None or self.clock() >= entry[1]
+
+    def success(self, key):
+        """Учёт успешной доставки."""
+        self.entries.pop(key, None)
+
+    def failure(self, key):
+        """Учёт неудачи. Возвращает паузу до следующей попытки."""
+        failures = self.entries.get(key, (0, 0))[0] + 1
+        delay = min(self.maximum, self.base * 2 ** (failures - 1))
+        self.entries[key] = (failures, self.clock() + delay)
+        return delay
+
+    def exhausted(self, key):
+        """Исчерпал ли получатель key число неудач подряд."""
+        return self.entries.get(key, (0, 0))[0] >= self.limit
+
+    def give_up(self, key):
+        """Учёт получателя недоступным сразу, без попыток доставки."""
+        self.entries[key] = (self.limit, self.clock() + self.maximum)
+
+    def __len__(self):
+        return len(self.entries)
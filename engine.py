@@ -0,0 +1,870 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+import environment  # noqa: F401
+from alerts import ERROR_WINDOW, ErrorAggregator
+from breaker import CircuitBreaker
+from changes import SeenSet, Snapshot, query_from, resume_from
+from commands import BOT_COMMANDS, StatusCache, register, start_polling
+from config import CONFIG_RELOAD, ENV_FILE, FileWatcher, read_env
+from decoding import HomeworkStream, aiter_homeworks, loads
+from delivery import DeliveryQueue, RecipientBackoff
+from exceptions import (
+    CircuitOpen, NoEnvironmentVariable, RetryLater, WrongAnswer, WrongRegistry,
+    WrongToken
+)
+from fingerprint import ResponseCache
+from history import (
+    COMPACT_INTERVAL, HISTORY_DIR, HistoryLog, HistoryReader, worker_directory
+)
+from homework import (
+    ENDPOINT, RETRY_PERIOD, TELEGRAM_API_URL, TELEGRAM_TOKEN, check_response,
+    parse_status
+)
+import logs
+import metrics
+from probe import PROBE_TIMEOUT, STARTUP_PROBE, probe
+from scheduler import RETRY_LATER_STATUSES, Scheduler, parse_retry_after
+from sharding import WORKER_COUNT, shard_tenants, worker_index
+from shutdown import SHUTDOWN_TIMEOUT, install_async
+from state import FLUSH_INTERVAL, StateStore
+import transport
+from webhook import RECONCILE_PERIOD, WEBHOOK_PORT, Receiver
+
+TENANTS_FILE = os.getenv('TENANTS_FILE', 'tenants.json')
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', 100))
+BACKFILL_FROM = os.getenv('BACKFILL_FROM')
+
+CACHE_HIT_RATE = metrics.REGISTRY.gauge(
+    'homework_cache_hit_rate', 'Доля неизменных ответов API')
+TENANTS = metrics.REGISTRY.gauge(
+    'homework_tenants', 'Число обслуживаемых арендаторов')
+QUARANTINED = metrics.REGISTRY.gauge(
+    'homework_quarantined_tenants', 'Число арендаторов на карантине')
+
+
+class Tenant:
+    """Арендатор: токен Практикума, чат студента и чаты подписчиков
+    (наставник, группа потока), куда уходят уведомления о статусах.
+    Сообщения об ошибках получает только чат студента.
+    """
+
+    __slots__ = ('key', 'practicum_token', 'chat_id', 'recipients')
+
+    def __init__(self, practicum_token, chat_id, key=None, subscribers=()):
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        self.key = key or str(chat_id)
+        self.recipients = tuple(dict.fromkeys((chat_id, *subscribers)))
+
+    def delivery_key(self, chat_id):
+        """Ключ состояния доставки получателю: у чата студента это ключ
+        арендатора, как до появления подписчиков.
+        """
+        if chat_id == self.chat_id:
+            return self.key
+        return f'{self.key}>{chat_id}'
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API Практикума."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+    def __repr__(self):
+        return f'Tenant({self.key!r})'
+
+
+def load_tenants(path=TENANTS_FILE):
+    """Загрузка реестра арендаторов.
+    Файл содержит JSON-список объектов с ключами practicum_token,
+    chat_id и необязательными key и subscribers (список чатов).
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            records = json.load(file)
+    except (OSError, ValueError) as error:
+        raise WrongRegistry(f'Не удалось прочитать реестр {path}: {error}')
+
+    if not isinstance(records, list):
+        raise WrongRegistry('Ожидается список арендаторов')
+    tenants = {}
+    for number, record in enumerate(records):
+        try:
+            subscribers = record.get('subscribers', [])
+            if not isinstance(subscribers, list):
+                raise TypeError('subscribers должен быть списком')
+            tenant = Tenant(record['practicum_token'], record['chat_id'],
+                            record.get('key'), subscribers)
+        except (KeyError, TypeError, AttributeError) as error:
+            raise WrongRegistry(
+                f'Некорректная запись №{number} в реестре: {error}')
+        if not tenant.practicum_token or not all(tenant.recipients):
+            raise WrongRegistry(f'Пустой токен или чат в записи №{number}')
+        if tenant.key in tenants:
+            raise WrongRegistry(f'Повторяющийся арендатор {tenant.key}')
+        tenants[tenant.key] = tenant
+    return list(tenants.values())
+
+
+class TenantState:
+    """Состояние арендатора в памяти движка.
+    Одна запись со слотами вместо нескольких словарей по ключу
+    арендатора; снимок и планировщик создаются при первом обращении.
+    """
+
+    __slots__ = ('timestamp', 'snapshot', 'scheduler')
+
+    def __init__(self, timestamp=None):
+        self.timestamp = timestamp
+        self.snapshot = None
+        self.scheduler = None
+
+
+class Engine:
+    """Асинхронный опрос API Практикума для множества арендаторов.
+    Число одновременных запросов ограничено семафором, сообщения уходят
+    через очередь доставки и не задерживают опрос. Доставленные смены
+    статусов дописываются в журнал history. При probe=True перед первым
+    опросом токены и чаты проверяются, а отклонённые арендаторы
+    отправляются на карантин.
+    """
+
+    def __init__(self, tenants, telegram_token,
+                 max_concurrency=MAX_CONCURRENCY, retry_period=RETRY_PERIOD,
+                 store=None, delivery=None, webhook_port=None,
+                 statuses=None, history=None, probe=False):
+        self.tenants = {tenant.key: tenant for tenant in tenants}
+        self.telegram_token = telegram_token
+        self.max_concurrency = max_concurrency
+        self.retry_period = retry_period
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.store = store
+        timestamps = store.load_timestamps() if store else {}
+        self.states = {key: TenantState(timestamps.get(key))
+                       for key in self.tenants}
+        self.errors = ErrorAggregator()
+        self.delivery = delivery or DeliveryQueue()
+        self.backoff = RecipientBackoff()
+        self.pending = set()
+        self.cache = ResponseCache()
+        self.seen = SeenSet()
+        self.api_breaker = CircuitBreaker('practicum')
+        self.telegram_breaker = CircuitBreaker('telegram')
+        self.stopping = None
+        self.client = None
+        self.pollers = {}
+        self.probe = probe
+        self.quarantined = {}
+        self.webhook_port = webhook_port
+        self.statuses = statuses
+        self.history = history
+        self.receiver = Receiver(self)
+
+    async def get_api_answer(self, client, tenant, timestamp):
+        """Асинхронный аналог homework.get_api_answer.
+        Возвращает необработанный ответ: тело разбирается, только если
+        оно отличается от последнего обработанного.
+        Пока предохранитель API разомкнут, запрос не выполняется.
+        """
+        if not self.api_breaker.allow():
+            raise CircuitOpen('API Практикума недоступно',
+                              self.api_breaker.remaining)
+        try:
+            with metrics.API_LATENCY.time():
+                response = await client.get(
+                    ENDPOINT,
+                    headers={**tenant.headers,
+                             **self.cache.headers(tenant.key)},
+                    params={'from_date': query_from(timestamp)})
+        except httpx.HTTPError as error:
+            self.api_breaker.failure()
+            metrics.API_ERRORS.inc('request_error')
+            raise WrongAnswer(f'Ошибка при выполнении HTTP-запроса: {error}:')
+
+        if response.status_code >= 500:
+            self.api_breaker.failure()
+        else:
+            self.api_breaker.success()
+        if response.status_code not in (200, 304):
+            metrics.API_ERRORS.inc(f'status_{response.status_code}')
+        if response.status_code in RETRY_LATER_STATUSES:
+            raise RetryLater(
+                f'Ошибка: Статус не ОК {response.status_code}:',
+                parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code not in (200, 304):
+            raise WrongAnswer(f'Ошибка: Статус не ОК {response.status_code}:')
+
+        return response
+
+    async def send_message(self, client, chat_id, message):
+        """Отправка сообщения в Telegram-чат через Bot API.
+        Пока предохранитель Telegram разомкнут, сообщение придерживается
+        в очереди доставки.
+        """
+        if not self.telegram_breaker.allow():
+            raise CircuitOpen('Telegram недоступен',
+                              self.telegram_breaker.remaining)
+        url = TELEGRAM_API_URL.format(token=self.telegram_token,
+                                      method='sendMessage')
+        try:
+            with metrics.SEND_LATENCY.time():
+                response = await client.post(
+                    url, json={'chat_id': chat_id, 'text': message})
+        except httpx.HTTPError as error:
+            self.telegram_breaker.failure()
+            metrics.TELEGRAM_ERRORS.inc('request_error')
+            logging.error(f'Ошибка отправки сообщения: {error}')
+            return False
+        if response.status_code >= 500:
+            self.telegram_breaker.failure()
+        else:
+            self.telegram_breaker.success()
+        if response.status_code != 200:
+            metrics.TELEGRAM_ERRORS.inc(f'status_{response.status_code}')
+        if response.status_code == 429:
+            parameters = response.json().get('parameters', {})
+            raise RetryLater('Ошибка Telegram: 429',
+                             parameters.get('retry_after'))
+        if response.status_code != 200:
+            logging.error(f'Ошибка Telegram: {response.status_code} '
+                          f'{response.text}')
+            return False
+        logging.debug('Успешная отправка сообщения')
+        return True
+
+    def is_delivered(self, key, homework_id, message):
+        """Было ли сообщение по работе уже доставлено получателю
+        с ключом key (Tenant.delivery_key).
+        """
+        return bool(self.store) and self.store.get_message(
+            key, homework_id) == message
+
+    def mark_delivered(self, tenant, homework_id, message):
+        """Учёт сообщения как доставленного всем получателям."""
+        if self.store:
+            for chat_id in tenant.recipients:
+                self.store.set_message(tenant.delivery_key(chat_id),
+                                       homework_id, message)
+
+    def set_timestamp(self, tenant, current_date):
+        """Сдвиг from_date арендатора после доставки всех изменений."""
+        self.state(tenant).timestamp = current_date
+        if self.store:
+            self.store.set_timestamp(tenant.key, current_date)
+
+    def deliver_changes(self, tenant, homeworks, current_date):
+        """Постановка в очередь сообщений обо всех изменившихся работах
+        для всех получателей арендатора. Текст готовится один раз
+        на событие, и все тексты готовятся до постановки первого из них
+        в очередь: ошибка разбора не оставляет часть событий без учёта.
+        Событие фиксируется в снимке сразу, чтобы следующий опрос
+        не поставил его повторно, и откатывается, если его получили
+        не все; при повторе сообщение уходит только тем, кто его ещё
+        не получил и у кого прошла пауза после неудачи.
+        """
+        snapshot = self.get_snapshot(tenant)
+        changes = [(event, parse_status(event.homework))
+                   for event in snapshot.diff(homeworks)]
+        deliveries = []
+        for event, message in changes:
+            snapshot.commit(event)
+            sends = []
+            logged = False
+            for chat_id in tenant.recipients:
+                key = tenant.delivery_key(chat_id)
+                if self.is_delivered(key, event.key, message):
+                    logged = True
+                elif self.backoff.ready(key):
+                    sends.append(
+                        (chat_id, self.delivery.put(chat_id, message)))
+                else:
+                    sends.append((chat_id, None))
+            if sends:
+                deliveries.append((event, message, sends, logged))
+        if not deliveries:
+            self.set_timestamp(tenant, current_date)
+            return
+        task = asyncio.create_task(
+            self.confirm(tenant, snapshot, deliveries, current_date))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def confirm(self, tenant, snapshot, deliveries, current_date):
+        """Учёт результатов доставки пачки сообщений.
+        Все получатели учитываются одновременно, и результат каждого
+        сохраняется, как только готов, так что медленный чат
+        не задерживает состояние остальных.
+        """
+        complete = await asyncio.gather(*(
+            self.settle(tenant, *delivery) for delivery in deliveries))
+        failed = []
+        for (event, *_), done in zip(deliveries, complete):
+            if not done:
+                snapshot.discard(event)
+                self.cache.forget(tenant.key)
+                failed.append(event)
+        self.set_timestamp(tenant, resume_from(
+            self.get_timestamp(tenant), current_date, failed))
+
+    async def settle(self, tenant, event, message, sends, logged):
+        """Результаты доставки события получателям sends — пар
+        (чат, future или None, если чат ещё на паузе). Смена статуса
+        пишется в журнал при первой доставке хоть одному получателю.
+        Возвращает True, если событие получили все, кроме подписчиков,
+        исчерпавших число неудач подряд: такой чат (например, группа,
+        из которой удалили бота) не держит from_date и кэш ответа
+        арендатора, а его сообщения пропускаются до первой удачной
+        доставки.
+        """
+        delivered = []
+
+        async def recipient(chat_id, future):
+            key = tenant.delivery_key(chat_id)
+            if future is not None:
+                if await future:
+                    self.backoff.success(key)
+                    delivered.append(chat_id)
+                    if self.store:
+                        self.store.set_message(key, event.key, message)
+                    return True
+                delay = self.backoff.failure(key)
+                logging.warning(f'{key}: сообщение не доставлено, следующая '
+                                f'попытка не раньше чем через {delay:.0f} с')
+            skipped = (chat_id != tenant.chat_id
+                       and self.backoff.exhausted(key))
+            if skipped:
+                logging.error(f'{key}: получатель недоступен, сообщение '
+                              f'ему пропущено')
+            return skipped
+
+        results = await asyncio.gather(*(
+            recipient(chat_id, future) for chat_id, future in sends))
+        if delivered and not logged and self.history is not None:
+            self.history.append(tenant.key, event.homework)
+        return all(results)
+
+    def notify_error(self, tenant, error):
+        """Постановка в очередь сообщения об ошибке без повторов
+        в пределах окна агрегации.
+        """
+        message = self.errors.report(
+            error, f'Сбой в работе программы: {error}', tenant.key)
+        if message is None:
+            return
+
+        def forget_failed(future):
+            if (future.cancelled() or future.exception() is not None
+                    or not future.result()):
+                self.errors.forget(error, tenant.key)
+
+        self.delivery.put(tenant.chat_id, message).add_done_callback(
+            forget_failed)
+
+    async def report_errors(self, interval=None):
+        """Периодическая отправка сводок о подавленных повторах ошибок."""
+        interval = interval or min(ERROR_WINDOW, 60)
+        while True:
+            await asyncio.sleep(interval)
+            for key, summary in self.errors.summaries():
+                tenant = self.tenants.get(key)
+                if tenant is not None:
+                    self.delivery.put(tenant.chat_id, summary)
+
+    def remember_statuses(self, tenant, homeworks):
+        """Обновление кэша статусов для команд бота, если он включён."""
+        if self.statuses is not None:
+            self.statuses.update(tenant.key, homeworks)
+
+    def ingest(self, tenant, response):
+        """Обработка обновления, присланного приёмником, без опроса API.
+        from_date не сдвигается: редкий сверочный опрос должен увидеть
+        и те изменения, которые в обновление не попали.
+        Возвращает число работ в обновлении.
+        """
+        homeworks = check_response(response)
+        timestamp = self.get_timestamp(tenant)
+        if homeworks:
+            self.remember_statuses(tenant, homeworks)
+            self.deliver_changes(tenant, homeworks, timestamp)
+        return len(homeworks)
+
+    async def drain(self):
+        """Дождаться доставки всех поставленных в очередь сообщений."""
+        await self.delivery.join()
+        await asyncio.gather(*self.pending)
+
+    async def poll_tenant(self, client, tenant):
+        """Один цикл опроса арендатора: запрос, проверка и уведомление."""
+        timestamp = self.get_timestamp(tenant)
+        scheduler = self.get_scheduler(tenant)
+        async with self.semaphore:
+            cycle_started = time.perf_counter()
+            try:
+                raw_response = await self.get_api_answer(client, tenant,
+                                                         timestamp)
+                if self.cache.unchanged(tenant.key, raw_response):
+                    scheduler.success(self.reviewing(tenant))
+                    logging.debug('Изменений статуса не найденно',
+                                  extra={'tenant': tenant.key})
+                    return
+                response = loads(raw_response.content)
+                homeworks = check_response(response)
+                if homeworks:
+                    self.remember_statuses(tenant, homeworks)
+                    self.deliver_changes(
+                        tenant, homeworks,
+                        response.get('current_date', timestamp))
+                else:
+                    logging.debug('Изменений статуса не найденно',
+                                  extra={'tenant': tenant.key})
+                scheduler.success(self.reviewing(tenant))
+                self.cache.remember(tenant.key, raw_response)
+            except CircuitOpen as error:
+                scheduler.postpone(error)
+                logging.debug(f'{tenant.key}: опрос пропущен: {error}')
+            except Exception as error:
+                if isinstance(error, WrongAnswer):
+                    scheduler.failure(error)
+                logging.error(f'{tenant.key}: Сбой в работе программы: '
+                              f'{error}')
+                self.notify_error(tenant, error)
+            finally:
+                metrics.POLL_CYCLE.observe(time.perf_counter() - cycle_started)
+
+    async def backfill(self, client, tenant, from_date=0):
+        """Загрузка истории арендатора с потоковым разбором ответа.
+        Работы по одной проверяются parse_status и заносятся в снимок
+        без уведомлений, а следующие опросы сообщают только о новых
+        переходах. Записи хранилища сбрасываются по ходу загрузки вне
+        цикла событий, так что память не зависит от размера истории.
+        Возвращает число обработанных работ.
+        """
+        snapshot = self.get_snapshot(tenant)
+        stream = HomeworkStream()
+        count = 0
+        async with self.semaphore:
+            try:
+                async with client.stream(
+                        'GET', ENDPOINT, headers=tenant.headers,
+                        params={'from_date': from_date}) as response:
+                    if response.status_code != 200:
+                        raise WrongAnswer(
+                            f'Ошибка: Статус не ОК {response.status_code}:')
+                    async for homework in aiter_homeworks(
+                            response.aiter_bytes(), stream):
+                        try:
+                            message = parse_status(homework)
+                        except (TypeError, KeyError, ValueError) as error:
+                            logging.warning(f'{tenant.key}: работа пропущена '
+                                            f'при загрузке истории: {error}')
+                            continue
+                        event = snapshot.changed(homework)
+                        if event:
+                            snapshot.commit(event)
+                            self.mark_delivered(tenant, event.key, message)
+                            if self.history is not None:
+                                self.history.append(tenant.key, homework)
+                        if self.store and self.store.due():
+                            await asyncio.to_thread(self.store.flush)
+                        count += 1
+            except httpx.HTTPError as error:
+                raise WrongAnswer(
+                    f'Ошибка при выполнении HTTP-запроса: {error}:')
+        self.set_timestamp(tenant,
+                           stream.fields.get('current_date', from_date))
+        logging.info(f'{tenant.key}: загружена история, работ: {count}')
+        return count
+
+    async def wait_next_tick(self, client, delay):
+        """Ожидание следующего опроса с прогревом соединения перед ним."""
+        if not transport.PREWARM or delay <= transport.PREWARM_LEAD:
+            await asyncio.sleep(delay)
+            return
+        await asyncio.sleep(delay - transport.PREWARM_LEAD)
+        await transport.prewarm(client, ENDPOINT)
+        await asyncio.sleep(transport.PREWARM_LEAD)
+
+    def state(self, tenant):
+        """Запись состояния арендатора."""
+        state = self.states.get(tenant.key)
+        if state is None:
+            state = self.states[tenant.key] = TenantState()
+        return state
+
+    def get_timestamp(self, tenant):
+        """from_date арендатора; для нового — текущее время."""
+        state = self.state(tenant)
+        if state.timestamp is None:
+            state.timestamp = int(time.time())
+        return state.timestamp
+
+    def get_snapshot(self, tenant):
+        """Снимок состояния работ арендатора."""
+        state = self.state(tenant)
+        if state.snapshot is None:
+            state.snapshot = Snapshot(self.seen, tenant.key)
+        return state.snapshot
+
+    def reviewing(self, tenant):
+        """Есть ли у арендатора работа на проверке (по снимку)."""
+        snapshot = self.state(tenant).snapshot
+        return snapshot is not None and snapshot.reviewing()
+
+    def get_scheduler(self, tenant):
+        """Планировщик опроса арендатора."""
+        state = self.state(tenant)
+        if state.scheduler is None:
+            state.scheduler = Scheduler(self.retry_period)
+        return state.scheduler
+
+    async def run_tenant(self, client, tenant):
+        """Бесконечный цикл опроса одного арендатора.
+        Первый опрос сдвинут на постоянную для арендатора фазу, чтобы
+        запросы разных арендаторов распределялись по всему периоду.
+        """
+        await asyncio.sleep(Scheduler.phase(tenant.key, self.retry_period))
+        if BACKFILL_FROM is not None:
+            try:
+                await self.backfill(client, tenant, int(BACKFILL_FROM))
+            except Exception as error:
+                logging.error(f'{tenant.key}: Сбой загрузки истории: {error}')
+        while tenant.key in self.tenants:
+            await self.poll_tenant(client, tenant)
+            delay = self.get_scheduler(tenant).next_delay()
+            await self.wait_next_tick(client, delay)
+
+    async def run(self, client=None):
+        """Запуск опроса всех арендаторов в одном цикле событий.
+        Работает до вызова stop(), после чего дожидается доставки
+        сообщений из очереди и сохраняет состояние.
+        """
+        if client is None:
+            async with transport.build_async_client(
+                    self.max_concurrency) as client:
+                return await self.run(client)
+        self.stopping = asyncio.Event()
+        if self.probe:
+            await self.startup_probe(client)
+        metrics.QUEUE_DEPTH.set_function(lambda: len(self.delivery))
+        CACHE_HIT_RATE.set_function(lambda: round(self.cache.hit_rate, 4))
+        TENANTS.set_function(lambda: len(self.tenants))
+        QUARANTINED.set_function(lambda: len(self.quarantined))
+        self.delivery.start(functools.partial(self.send_message, client))
+        self.client = client
+        for tenant in list(self.tenants.values()):
+            self.start_tenant(tenant)
+        tasks = [asyncio.create_task(self.report_errors())]
+        if self.store:
+            tasks.append(asyncio.create_task(self.flush_state()))
+        if self.history is not None:
+            tasks.append(asyncio.create_task(self.compact_history()))
+        try:
+            if self.webhook_port is not None:
+                await self.receiver.start(self.webhook_port)
+            await self.stopping.wait()
+        finally:
+            await self.receiver.stop()
+            tasks += self.pollers.values()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.client = None
+            await self.shutdown()
+
+    async def startup_probe(self, client, timeout=PROBE_TIMEOUT):
+        """Проверка бота и арендаторов до запуска опроса."""
+        started = time.perf_counter()
+        report = await probe(client, self.telegram_token,
+                             list(self.tenants.values()),
+                             self.max_concurrency, timeout)
+        for key, reason in report.quarantined.items():
+            self.quarantine(key, reason)
+        for key, reason in report.unverified.items():
+            logging.warning(f'{key}: не удалось проверить при запуске: '
+                            f'{reason}')
+        for key, reason in report.rejected_subscribers.items():
+            self.backoff.give_up(key)
+            logging.warning(f'{key}: чат подписчика отклонён, сообщения '
+                            f'ему пропускаются: {reason}')
+        logging.info(f'Проверка при запуске за '
+                     f'{time.perf_counter() - started:.1f} с: исправны '
+                     f'{len(report.healthy)}, на карантине '
+                     f'{len(report.quarantined)}')
+        return report
+
+    def quarantine(self, key, reason):
+        """Исключение арендатора из опроса до исправления реестра."""
+        tenant = self.tenants.pop(key)
+        self.states.pop(key, None)
+        self.quarantined[key] = tenant
+        logging.warning(f'{key}: арендатор на карантине: {reason}')
+
+    def start_tenant(self, tenant):
+        """Запуск цикла опроса арендатора, если движок работает."""
+        if self.client is None:
+            return
+        task = asyncio.create_task(self.run_tenant(self.client, tenant))
+        self.pollers[tenant.key] = task
+
+        def forget(done):
+            if self.pollers.get(tenant.key) is done:
+                del self.pollers[tenant.key]
+
+        task.add_done_callback(forget)
+
+    def reload(self, tenants=None, values=None):
+        """Применение перечитанных реестра и .env без перезапуска.
+        Вызывается в цикле событий, поэтому изменения видны опросам
+        целиком; пул соединений, снимки и очередь доставки сохраняются.
+        """
+        if values is not None:
+            self.apply_settings(values)
+        if tenants is not None:
+            self.apply_tenants(tenants)
+
+    def apply_settings(self, values):
+        """Смена токена бота и периода опроса."""
+        token = values.get('TELEGRAM_TOKEN')
+        if not token:
+            logging.error('Новые настройки не применены: '
+                          'отсутствуют токены: TELEGRAM_TOKEN')
+            return
+        if token != self.telegram_token:
+            self.telegram_token = token
+            logging.info('Токен Telegram обновлён')
+        if self.webhook_port is not None or 'RETRY_PERIOD' not in values:
+            return
+        try:
+            period = int(values['RETRY_PERIOD'])
+        except ValueError as error:
+            logging.error(f'Новый RETRY_PERIOD не применён: {error}')
+            return
+        self.retry_period = period
+        for state in self.states.values():
+            if state.scheduler is not None:
+                state.scheduler.set_period(period)
+
+    def apply_tenants(self, tenants):
+        """Добавление, удаление и смена токенов арендаторов.
+        У оставшихся арендаторов объект Tenant меняется на месте, так что
+        их циклы опроса продолжаются с тем же состоянием. Арендатор
+        на карантине возвращается в опрос, когда в реестре меняются его
+        токен или чат.
+        """
+        tenants = {tenant.key: tenant for tenant in tenants}
+        self.quarantined = {
+            key: tenant for key, tenant in self.quarantined.items()
+            if key in tenants and (tenant.practicum_token, tenant.recipients)
+            == (tenants[key].practicum_token, tenants[key].recipients)}
+        removed = self.tenants.keys() - tenants.keys()
+        added = rotated = 0
+        for key in removed:
+            del self.tenants[key]
+            self.states.pop(key, None)
+            self.cache.forget(key)
+            task = self.pollers.pop(key, None)
+            if task is not None:
+                task.cancel()
+        for key, tenant in tenants.items():
+            current = self.tenants.get(key)
+            if key in self.quarantined:
+                continue
+            if current is None:
+                self.tenants[key] = tenant
+                self.states[key] = TenantState(
+                    self.store.get_timestamp(key) if self.store else None)
+                self.start_tenant(tenant)
+                added += 1
+            elif (current.practicum_token, current.recipients) != (
+                    tenant.practicum_token, tenant.recipients):
+                current.practicum_token = tenant.practicum_token
+                current.chat_id = tenant.chat_id
+                current.recipients = tenant.recipients
+                self.cache.forget(key)
+                rotated += 1
+        logging.info(f'Реестр перечитан: добавлено {added}, удалено '
+                     f'{len(removed)}, сменили токен или получателей '
+                     f'{rotated}')
+
+    def stop(self):
+        """Запрос остановки движка."""
+        logging.info('Движок завершает работу')
+        if self.stopping is not None:
+            self.stopping.set()
+
+    async def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        """Доставка сообщений из очереди и сохранение состояния
+        с ограничением по времени.
+        """
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f'Не доставлено сообщений при остановке: '
+                            f'{len(self.delivery)}')
+        await self.delivery.stop()
+        if self.store:
+            await asyncio.to_thread(self.store.flush)
+
+    async def flush_state(self):
+        """Периодический сброс состояния на диск вне цикла событий."""
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await asyncio.to_thread(self.store.flush)
+
+    async def compact_history(self, interval=COMPACT_INTERVAL):
+        """Периодическое слияние сегментов журнала вне цикла событий."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.history.compact)
+            except OSError as error:
+                logging.error(f'Ошибка слияния журнала истории: {error}')
+
+
+def watch_config(engine, loop, index, commands=None):
+    """Наблюдение за .env и реестром арендаторов.
+    Файлы читаются и проверяются в потоке наблюдения, а применяются
+    в цикле событий движка. Ошибочный реестр или .env без токена
+    не применяются, движок продолжает работать с прежними.
+    commands — пара (бот, соответствие чатов арендаторам) воркера,
+    принимающего команды.
+    """
+    env_path, registry_path = map(os.path.abspath, (ENV_FILE, TENANTS_FILE))
+
+    def changed(paths):
+        tenants = values = None
+        if registry_path in paths:
+            try:
+                registry = load_tenants(TENANTS_FILE)
+            except WrongRegistry as error:
+                logging.error(f'Новый реестр не применён: {error}')
+            else:
+                tenants = shard_tenants(registry, index, WORKER_COUNT)
+                if commands is not None:
+                    update_chats(commands[1], registry)
+        if env_path in paths:
+            values = read_env(ENV_FILE)
+            if commands is not None and values.get('TELEGRAM_TOKEN'):
+                commands[0].token = values['TELEGRAM_TOKEN']
+        loop.call_soon_threadsafe(engine.reload, tenants, values)
+
+    return FileWatcher([ENV_FILE, TENANTS_FILE], changed).start()
+
+
+async def serve(engine, index=0, commands=None):
+    """Работа движка до сигнала SIGTERM или SIGINT."""
+    loop = asyncio.get_running_loop()
+    install_async(loop, engine.stop)
+    watcher = None
+    if CONFIG_RELOAD:
+        watcher = watch_config(engine, loop, index, commands)
+    try:
+        await engine.run()
+    finally:
+        if watcher is not None:
+            await asyncio.to_thread(watcher.stop)
+
+
+def update_chats(chats, tenants):
+    """Обновление соответствия чатов арендаторам на месте."""
+    current = {str(tenant.chat_id): tenant.key for tenant in tenants}
+    chats.update(current)
+    for chat_id in chats.keys() - current.keys():
+        chats.pop(chat_id, None)
+
+
+def serve_commands(statuses, tenants):
+    """Приём команд бота в фоновом потоке для всего реестра.
+    Ответы берутся из кэша статусов, общего файла состояния и журналов
+    истории всех воркеров, поэтому один воркер отвечает и за арендаторов
+    других шардов. Возвращает бота и соответствие чатов арендаторам,
+    чтобы их можно было обновить при смене токена или реестра.
+    """
+    from telebot import TeleBot  # type: ignore
+
+    bot = TeleBot(token=TELEGRAM_TOKEN)
+    transport.configure_telebot()
+    chats = {}
+    update_chats(chats, tenants)
+    register(bot, statuses, chats)
+    start_polling(bot)
+    return bot, chats
+
+
+def worker_histories(history, index):
+    """Журналы истории для команд бота: свой журнал воркера, а у воркера,
+    принимающего команды, ещё и журналы остальных воркеров для чтения.
+    """
+    if history is None:
+        return []
+    if index != 0:
+        return [history]
+    return [history] + [HistoryReader(worker_directory(other, WORKER_COUNT))
+                        for other in range(1, WORKER_COUNT)]
+
+
+def engine_options(store, history, index, registry):
+    """Параметры Engine воркера index и, у воркера, принимающего
+    команды, пара (бот, соответствие чатов) для serve().
+    """
+    options = {'history': history, 'probe': STARTUP_PROBE}
+    commands = None
+    if WEBHOOK_PORT:
+        options.update(retry_period=RECONCILE_PERIOD,
+                       webhook_port=int(WEBHOOK_PORT) + index)
+    if BOT_COMMANDS:
+        options['statuses'] = StatusCache(
+            store, histories=worker_histories(history, index))
+        if index == 0:
+            commands = serve_commands(options['statuses'], registry)
+    return options, commands
+
+
+def main():
+    """Запуск многопользовательского движка."""
+    try:
+        if not TELEGRAM_TOKEN:
+            raise NoEnvironmentVariable('Отсутствуют токены: TELEGRAM_TOKEN')
+        registry = load_tenants()
+        index = worker_index()
+        tenants = shard_tenants(registry, index, WORKER_COUNT)
+    except (NoEnvironmentVariable, WrongRegistry, ValueError) as error:
+        logging.critical(f'Невозможно запустить движок: {error}')
+        sys.exit(1)
+    logging.info(f'Воркер {index + 1} из {WORKER_COUNT}, '
+                 f'арендаторов: {len(tenants)}')
+    if metrics.METRICS_PORT:
+        metrics.start_exporter(int(metrics.METRICS_PORT) + index)
+    history = None
+    if HISTORY_DIR:
+        history = HistoryLog(worker_directory(index, WORKER_COUNT))
+    try:
+        with StateStore(autoflush=False) as store:
+            options, commands = engine_options(store, history, index,
+                                               registry)
+            engine = Engine(tenants, TELEGRAM_TOKEN, store=store, **options)
+            asyncio.run(serve(engine, index, commands))
+    except WrongToken as error:
+        logging.critical(f'Невозможно запустить движок: {error}')
+        sys.exit(1)
+    finally:
+        if history is not None:
+            history.close()
+    logging.info('Движок остановлен')
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[logs.queue_handler(__file__ + '.log')]
+    )
+
+    main()
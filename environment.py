@@ -0,0 +1,9 @@
+import os
+
+from dotenv import load_dotenv  # type: ignore
+
+# Загрузка .env при первом импорте. Модули проекта читают настройки
+# через os.getenv при импорте, поэтому точки входа импортируют этот
+# модуль раньше всех остальных модулей проекта. Путь к файлу тот же,
+# что у перечитывания конфигурации (config.ENV_FILE).
+load_dotenv(os.getenv('ENV_FILE', '.env'))
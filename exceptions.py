@@ -10,3 +10,52 @@ class WrongAnswer(Exception):
     положительного ответа
     """
     pass
+
+
+class WrongRegistry(Exception):
+    """Класс исключений некорректного реестра арендаторов
+    (файла с парами токен/чат)
+    """
+    pass
+
+
+class RetryLater(WrongAnswer):
+    """Класс исключений, когда API просит повторить запрос позже
+    (ответы 429 и 503 с заголовком Retry-After)
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Shutdown(BaseException):
+    """Исключение остановки бота по сигналу SIGTERM или SIGINT.
+    Наследуется от BaseException, чтобы его не перехватывал
+    общий обработчик ошибок в цикле опроса
+    """
+    pass
+
+
+class WrongRequest(Exception):
+    """Класс исключений некорректного запроса к приёмнику обновлений,
+    status — HTTP-статус ответа
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpen(RetryLater):
+    """Исключение открытого предохранителя: вызов внешнего сервиса
+    пропущен, повторить его можно через retry_after секунд
+    """
+    pass
+
+
+class WrongToken(Exception):
+    """Класс исключений токена, который внешний сервис отклонил
+    при проверке на старте
+    """
+    pass
@@ -0,0 +1,64 @@
+import hashlib
+import re
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*-?\d+')
+
+
+def fingerprint(body):
+    """Отпечаток тела ответа API.
+    current_date меняется при каждом запросе, поэтому в отпечаток
+    не входит; остальное тело хешируется без разбора JSON.
+    """
+    return hashlib.blake2b(CURRENT_DATE.sub(b'', body),
+                           digest_size=16).digest()
+
+
+class ResponseCache:
+    """Отпечатки последних обработанных ответов API по арендаторам."""
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def headers(self, tenant):
+        """Заголовки условного запроса для арендатора."""
+        entry = self.entries.get(tenant)
+        if entry and entry[0]:
+            return {'If-None-Match': entry[0]}
+        return {}
+
+    def unchanged(self, tenant, response):
+        """Совпадает ли ответ с последним обработанным."""
+        if response.status_code == 304:
+            self.hits += 1
+            self.not_modified += 1
+            return True
+        entry = self.entries.get(tenant)
+        if entry and entry[1] == fingerprint(response.content):
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def remember(self, tenant, response):
+        """Запомнить ответ после его успешной обработки."""
+        self.entries[tenant] = (response.headers.get('ETag'),
+                                fingerprint(response.content))
+
+    def forget(self, tenant):
+        """Сбросить отпечаток, чтобы следующий ответ обработался заново."""
+        self.entries.pop(tenant, None)
+
+    @property
+    def hit_rate(self):
+        """Доля ответов, обработка которых была пропущена."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """Счётчики кэша."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': round(self.hit_rate, 4)}
@@ -0,0 +1,408 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import defaultdict
+
+from changes import homework_key
+from decoding import loads
+
+HISTORY_DIR = os.getenv('HISTORY_DIR', 'homework_history')
+SEGMENT_SIZE = int(os.getenv('HISTORY_SEGMENT_SIZE', 4 * 1024 * 1024))
+COMPACT_AFTER = int(os.getenv('HISTORY_COMPACT_AFTER', 8))
+COMPACT_INTERVAL = float(os.getenv('HISTORY_COMPACT_INTERVAL', 300))
+
+SEGMENT = re.compile(r'^segment-(\d{8})\.log$')
+ENTRY = struct.Struct('>QQ')
+INDEXES = ('tenant', 'homework')
+
+
+def key_hash(*parts):
+    """64-битный ключ индекса по арендатору или паре арендатор/работа."""
+    digest = hashlib.blake2b('\x00'.join(map(str, parts)).encode(),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def record_keys(record):
+    """Ключи записи для индексов по арендатору и по работе."""
+    return {'tenant': key_hash(record['tenant']),
+            'homework': key_hash(record['tenant'], record['homework'])}
+
+
+def write_index(path, entries, size):
+    """Запись индекса: заголовок с размером сегмента и отсортированные
+    пары (ключ, смещение).
+    """
+    with open(path + '.tmp', 'wb') as file:
+        file.write(ENTRY.pack(size, 0))
+        for entry in sorted(entries):
+            file.write(ENTRY.pack(*entry))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def index_header(path):
+    """Размер сегмента, для которого построен индекс, или None."""
+    try:
+        with open(path, 'rb') as file:
+            return ENTRY.unpack(file.read(ENTRY.size))[0]
+    except (OSError, struct.error):
+        return None
+
+
+def search_index(path, key):
+    """Смещения записей с ключом key двоичным поиском по индексу."""
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size <= ENTRY.size:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            low, high = 1, size // ENTRY.size
+            while low < high:
+                middle = (low + high) // 2
+                if ENTRY.unpack_from(view, middle * ENTRY.size)[0] < key:
+                    low = middle + 1
+                else:
+                    high = middle
+            offsets = []
+            for position in range(low, size // ENTRY.size):
+                found, offset = ENTRY.unpack_from(view, position * ENTRY.size)
+                if found != key:
+                    break
+                offsets.append(offset)
+    return offsets
+
+
+class Segment:
+    """Файл сегмента журнала и пути его индексов."""
+
+    def __init__(self, directory, number):
+        self.number = number
+        self.path = os.path.join(directory, f'segment-{number:08d}.log')
+
+    def index_path(self, name):
+        """Путь индекса name ('tenant' или 'homework')."""
+        return f'{self.path}.{name}.idx'
+
+    @property
+    def sealed(self):
+        """У сегмента есть индексы на диске, построенные именно для него."""
+        size = os.path.getsize(self.path)
+        return all(index_header(self.index_path(name)) == size
+                   for name in INDEXES)
+
+    def scan(self):
+        """Все записи сегмента: пары (смещение, запись)."""
+        records = []
+        with open(self.path, 'rb') as file:
+            offset = 0
+            for line in file:
+                if line.endswith(b'\n'):
+                    records.append((offset, loads(line)))
+                offset += len(line)
+        return records
+
+    def read(self, offsets):
+        """Записи по смещениям."""
+        records = []
+        with open(self.path, 'rb') as file:
+            for offset in sorted(offsets):
+                file.seek(offset)
+                records.append(loads(file.readline()))
+        return records
+
+    def seal(self, records=None):
+        """Построение индексов сегмента на диске."""
+        entries = defaultdict(list)
+        for offset, record in records or self.scan():
+            for name, key in record_keys(record).items():
+                entries[name].append((key, offset))
+        size = os.path.getsize(self.path)
+        for name in INDEXES:
+            write_index(self.index_path(name), entries[name], size)
+
+    def remove(self):
+        """Удаление сегмента вместе с индексами."""
+        for path in (self.path, *map(self.index_path, INDEXES)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_segments(directory):
+    """Сегменты каталога в порядке номеров."""
+    numbers = sorted(int(match.group(1)) for match in map(
+        SEGMENT.match, os.listdir(directory)) if match)
+    return [Segment(directory, number) for number in numbers]
+
+
+def memory_index(segment):
+    """Индекс сегмента в памяти: (индекс, ключ) -> смещения."""
+    memory = defaultdict(list)
+    for offset, record in segment.scan():
+        for name, key in record_keys(record).items():
+            memory[name, key].append(offset)
+    return memory
+
+
+def worker_directory(index, count, path=HISTORY_DIR):
+    """Каталог журнала воркера: при шардировании у каждого свой."""
+    return path if count == 1 else os.path.join(path, f'worker-{index}')
+
+
+class HistoryLog:
+    """Журнал смен статусов только на дозапись, разбитый на сегменты.
+    Каждая запись — строка JSON с арендатором, работой, статусом,
+    датой обновления и комментарием ревьюера. У закрытых сегментов есть
+    отсортированные индексы по арендатору и по работе, поэтому запрос
+    истории — двоичный поиск, а не просмотр журнала. Активный сегмент
+    индексируется в памяти. Закрытый сегмент получает индексы на диске
+    в фоновом потоке, а до тех пор ищется по индексу в памяти: append
+    вызывается и из цикла событий движка. Старые сегменты сливаются
+    в фоне.
+    """
+
+    def __init__(self, path=HISTORY_DIR, segment_size=SEGMENT_SIZE,
+                 compact_after=COMPACT_AFTER):
+        self.directory = path
+        self.segment_size = segment_size
+        self.compact_after = compact_after
+        self.lock = threading.Lock()
+        self.compacting = threading.RLock()
+        self.closed = threading.Event()
+        self.unsealed = {}
+        self.sealer = None
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if '.compact' in name or name.endswith('.tmp'):
+                os.remove(os.path.join(path, name))
+        self.segments = list_segments(path)
+        for segment in self.segments[:-1]:
+            if not segment.sealed:
+                segment.seal()
+        if not self.segments or self.segments[-1].sealed:
+            number = self.segments[-1].number + 1 if self.segments else 1
+            self.segments.append(Segment(path, number))
+        self.open_active()
+
+    def open_active(self):
+        """Открытие активного сегмента и его индекса в памяти."""
+        self.active = self.segments[-1]
+        self.file = open(self.active.path, 'ab+')
+        self.size = self.file.tell()
+        if self.size:
+            self.file.seek(0)
+            complete = self.file.read().rfind(b'\n') + 1
+            if complete != self.size:
+                logging.warning('Журнал истории: отброшена неполная запись')
+                self.file.truncate(complete)
+                self.size = complete
+        self.memory = memory_index(self.active)
+
+    def append(self, tenant, homework):
+        """Запись смены статуса работы в журнал."""
+        record = {
+            'tenant': str(tenant),
+            'homework': str(homework_key(homework)),
+            'name': homework.get('homework_name'),
+            'status': homework.get('status'),
+            'date_updated': homework.get('date_updated'),
+            'reviewer_comment': homework.get('reviewer_comment'),
+            'logged_at': int(time.time()),
+        }
+        line = json.dumps(record, ensure_ascii=False).encode() + b'\n'
+        with self.lock:
+            offset = self.size
+            self.file.write(line)
+            self.file.flush()
+            self.size += len(line)
+            for name, key in record_keys(record).items():
+                self.memory[name, key].append(offset)
+            if self.size >= self.segment_size:
+                self.rotate()
+
+    def rotate(self):
+        """Закрытие активного сегмента и начало нового. fsync и индексы
+        закрытого сегмента достаются фоновому потоку (seal_closed).
+        """
+        self.file.close()
+        self.unsealed[self.active] = self.memory
+        self.segments.append(Segment(self.directory, self.active.number + 1))
+        self.open_active()
+        self.sealer = threading.Thread(target=self.seal_closed, daemon=True,
+                                       name='history-sealer')
+        self.sealer.start()
+
+    def seal_closed(self):
+        """Сброс на диск и индексы закрытых сегментов вне self.lock.
+        До записи индексов сегмент ищется по индексу в памяти.
+        """
+        with self.compacting:
+            with self.lock:
+                segments = list(self.unsealed)
+            for segment in segments:
+                try:
+                    with open(segment.path, 'rb') as file:
+                        os.fsync(file.fileno())
+                    segment.seal()
+                except OSError as error:
+                    logging.error(f'Ошибка закрытия сегмента журнала '
+                                  f'истории: {error}')
+                    return
+                with self.lock:
+                    del self.unsealed[segment]
+
+    def query(self, tenant, homework=None, limit=None):
+        """Смены статусов арендатора или одной его работы
+        от старых к новым; limit ограничивает число последних записей.
+        """
+        if homework is None:
+            name, key = 'tenant', key_hash(tenant)
+        else:
+            name, key = 'homework', key_hash(tenant, homework)
+        found = []
+        with self.lock:
+            for segment in reversed(self.segments):
+                if segment is self.active:
+                    offsets = self.memory.get((name, key), [])
+                elif segment in self.unsealed:
+                    offsets = self.unsealed[segment].get((name, key), [])
+                else:
+                    offsets = search_index(segment.index_path(name), key)
+                records = [
+                    record for record in segment.read(offsets)
+                    if record['tenant'] == str(tenant) and (
+                        homework is None
+                        or record['homework'] == str(homework))
+                ]
+                found = records + found
+                if limit is not None and len(found) >= limit:
+                    break
+        return found[-limit:] if limit else found
+
+    def compact(self):
+        """Слияние закрытых сегментов в один, если их больше
+        compact_after. Одинаковые смены статусов остаются в одном
+        экземпляре. Возвращает число слитых сегментов.
+        """
+        with self.compacting:
+            self.seal_closed()
+            with self.lock:
+                sealed = [segment for segment in self.segments[:-1]
+                          if segment not in self.unsealed]
+            if len(sealed) <= self.compact_after:
+                return 0
+            target = sealed[-1]
+            merged = Segment(self.directory, target.number)
+            merged.path = target.path + '.compact'
+            seen = set()
+            records = []
+            with open(merged.path, 'wb') as file:
+                for segment in sealed:
+                    for _, record in segment.scan():
+                        identity = (record['tenant'], record['homework'],
+                                    record['status'], record['date_updated'])
+                        if identity in seen:
+                            continue
+                        seen.add(identity)
+                        records.append((file.tell(), record))
+                        file.write(json.dumps(
+                            record, ensure_ascii=False).encode() + b'\n')
+                file.flush()
+                os.fsync(file.fileno())
+            merged.seal(records)
+            with self.lock:
+                os.replace(merged.path, target.path)
+                for name in INDEXES:
+                    os.replace(merged.index_path(name),
+                               target.index_path(name))
+                for segment in sealed[:-1]:
+                    segment.remove()
+                self.segments = [target] + self.segments[len(sealed):]
+        logging.info(f'Журнал истории: слито сегментов {len(sealed)}')
+        return len(sealed)
+
+    def start_compactor(self, interval=COMPACT_INTERVAL):
+        """Периодическое слияние сегментов в фоновом потоке."""
+
+        def run():
+            while not self.closed.wait(interval):
+                try:
+                    self.compact()
+                except OSError as error:
+                    logging.error(f'Ошибка слияния журнала истории: {error}')
+
+        thread = threading.Thread(target=run, daemon=True,
+                                  name='history-compactor')
+        thread.start()
+        return thread
+
+    def close(self):
+        """Остановка слияния, закрытие сегментов и активного сегмента."""
+        self.closed.set()
+        self.seal_closed()
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class HistoryReader(HistoryLog):
+    """Чтение журнала, который ведёт другой процесс.
+    Перед каждым запросом список сегментов перечитывается; закрытые
+    сегменты ищутся по индексам, сегменты без индексов (последний или
+    ещё не закрытый писателем) просматриваются целиком (каждый не больше
+    segment_size).
+    """
+
+    def __init__(self, path):
+        self.directory = path
+        self.lock = threading.Lock()
+        self.segments = []
+        self.active = None
+        self.memory = {}
+        self.unsealed = {}
+
+    def refresh(self):
+        """Перечитывание списка сегментов каталога."""
+        self.segments = list_segments(self.directory) if os.path.isdir(
+            self.directory) else []
+        self.active = None
+        self.memory = {}
+        self.unsealed = {segment: memory_index(segment)
+                         for segment in self.segments[:-1]
+                         if not segment.sealed}
+        if self.segments and not self.segments[-1].sealed:
+            self.active = self.segments[-1]
+            self.memory = memory_index(self.active)
+
+    def query(self, tenant, homework=None, limit=None):
+        """Запрос как у HistoryLog; при слиянии сегментов во время
+        чтения запрос повторяется.
+        """
+        for attempt in range(2):
+            try:
+                self.refresh()
+                return super().query(tenant, homework, limit)
+            except (OSError, ValueError):
+                if attempt:
+                    raise
+        return []
+
+    def append(self, tenant, homework):
+        raise TypeError('Журнал открыт только для чтения')
+
+    def close(self):
+        pass
@@ -3,38 +3,43 @@ import os
 import sys
 import time
 
-from dotenv import load_dotenv  # type: ignore
-from telebot import TeleBot  # type: ignore
-from telegram.error import TelegramError  # type: ignore
-import requests  # type: ignore
-
+import environment  # noqa: F401
+from alerts import ErrorAggregator
+from changes import SeenSet, Snapshot, query_from, resume_from
+from commands import BOT_COMMANDS, StatusCache, register, start_polling
+from config import CONFIG_RELOAD, ENV_FILE, FileWatcher, read_env
 from exceptions import (
-    NoEnvironmentVariable, WrongAnswer
+    NoEnvironmentVariable, RetryLater, Shutdown, WrongAnswer
 )
-
-load_dotenv()
+from history import HISTORY_DIR, HistoryLog
+import logs
+import metrics
+from scheduler import RETRY_LATER_STATUSES, Scheduler, parse_retry_after
+from shutdown import GracefulShutdown
+from state import StateStore
+import transport
+from verdicts import HOMEWORK_VERDICTS
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
+RECORD_FILE = os.getenv('RECORD_FILE')
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+TELEGRAM_API_URL = 'https://api.telegram.org/bot{token}/{method}'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
-
 
-def check_tokens():
-    """Проверка наличия токенов и эндпоинта."""
-    tokens = {'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
-              'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
-              'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID,
-              }
+def check_tokens(tokens=None):
+    """Проверка наличия токенов и эндпоинта.
+    По умолчанию проверяются текущие значения модуля.
+    """
+    if tokens is None:
+        tokens = {'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
+                  'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
+                  'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID,
+                  }
     invalid_tokens = [name for name, value in tokens.items() if not value]
 
     if invalid_tokens:
@@ -44,16 +49,50 @@ def check_tokens():
         raise NoEnvironmentVariable('Ошибка: ENDPOINT не определен')
 
 
+def apply_settings(values, bot=None):
+    """Применение токенов без перезапуска.
+    values — переменные окружения вместе с перечитанным .env. Новые
+    значения проверяются check_tokens и при ошибке не применяются.
+    Токен бота меняется в самом объекте bot, поэтому соединения
+    и состояние сохраняются. Возвращает имена изменившихся переменных.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, HEADERS
+
+    tokens = {name: values.get(name) for name in
+              ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')}
+    check_tokens(tokens)
+    changed = [name for name, value in tokens.items()
+               if globals()[name] != value]
+    HEADERS = {'Authorization': f'OAuth {tokens["PRACTICUM_TOKEN"]}'}
+    PRACTICUM_TOKEN = tokens['PRACTICUM_TOKEN']
+    TELEGRAM_TOKEN = tokens['TELEGRAM_TOKEN']
+    TELEGRAM_CHAT_ID = tokens['TELEGRAM_CHAT_ID']
+    if bot is not None:
+        bot.token = TELEGRAM_TOKEN
+    return changed
+
+
 def get_api_answer(timestamp):
     """Получение API ответа.
     Функция делает запрос к единственному эндпоинту API-сервиса.
     """
+    import requests  # type: ignore
+
     try:
-        response = requests.get(
-            ENDPOINT, headers=HEADERS, params={'from_date': timestamp})
+        with metrics.API_LATENCY.time():
+            response = requests.get(
+                ENDPOINT, headers=HEADERS, params={'from_date': timestamp},
+                timeout=transport.TIMEOUT)
     except requests.exceptions.RequestException as error:
+        metrics.API_ERRORS.inc('request_error')
         raise WrongAnswer(f'Ошибка при выполнении HTTP-запроса: {error}:')
 
+    if response.status_code != 200:
+        metrics.API_ERRORS.inc(f'status_{int(response.status_code)}')
+    if response.status_code in RETRY_LATER_STATUSES:
+        raise RetryLater(
+            f'Ошибка: Статус не ОК {response.status_code}:',
+            parse_retry_after(response.headers.get('Retry-After')))
     if response.status_code != 200:
         raise WrongAnswer(f'Ошибка: Статус не ОК {response.status_code}:')
 
@@ -107,20 +146,140 @@ def parse_status(homework):
 
 def send_message(bot, message):
     """Отправка сообщения в Telegram-чат."""
+    import requests  # type: ignore
+    from telebot.apihelper import ApiException  # type: ignore
+
     try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        with metrics.SEND_LATENCY.time():
+            bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
         logging.debug('Успешная отправка сообщения')
         return True
-    except TelegramError as error:
+    except ApiException as error:
+        metrics.TELEGRAM_ERRORS.inc('api_exception')
         logging.error(f'Ошибка Telegram: {error}')
     except requests.RequestException as error:
+        metrics.TELEGRAM_ERRORS.inc('request_error')
         logging.error(f'Ошибка отправки сообщения: {error}')
     except Exception as error:
+        metrics.TELEGRAM_ERRORS.inc('unexpected')
         logging.error(f'Неожиданная ошибка отправки сообщения: {error}')
 
     return False
 
 
+def deliver_changes(bot, snapshot, store, homeworks, chat_id=None,
+                    history=None):
+    """Отправка сообщений обо всех изменившихся работах.
+    Состояние сохраняется под chat_id, по умолчанию TELEGRAM_CHAT_ID;
+    доставленные смены статусов дописываются в журнал history. Уже
+    доставленное до перезапуска сообщение не отправляется и в журнал
+    повторно не пишется.
+    Возвращает список недоставленных событий.
+    """
+    chat_id = chat_id or TELEGRAM_CHAT_ID
+    failed = []
+    for event in snapshot.diff(homeworks):
+        message = parse_status(event.homework)
+        if store.get_message(chat_id, event.key) == message:
+            snapshot.commit(event)
+        elif send_message(bot, message):
+            snapshot.commit(event)
+            store.set_message(chat_id, event.key, message)
+            if history is not None:
+                history.append(chat_id, event.homework)
+        else:
+            failed.append(event)
+    return failed
+
+
+class Poller:
+    """Состояние цикла опроса main().
+    Хранит from_date, снимок работ, планировщик и агрегатор ошибок;
+    один вызов poll() — один цикл. Если передан кэш statuses, в него
+    попадает каждый ответ API для команд /status и /pending;
+    доставленные смены статусов пишутся в журнал history. Источник
+    ответов API (fetch), часы (clock) и ключ состояния (chat_id) можно
+    подменить, чтобы прогонять записанный трафик с виртуальным временем.
+    Если передан watcher (config.FileWatcher), изменившийся .env
+    применяется в начале следующего цикла; ключом состояния остаётся
+    прежний chat_id, а соответствие chats для команд бота переводится
+    на новый чат.
+    """
+
+    def __init__(self, bot, store, fetch=None, clock=time, chat_id=None,
+                 statuses=None, history=None, watcher=None):
+        """Начальное состояние из хранилища store."""
+        self.bot = bot
+        self.store = store
+        self.statuses = statuses
+        self.history = history
+        self.watcher = watcher
+        self.fetch = fetch
+        self.clock = clock
+        self.chat_id = chat_id or TELEGRAM_CHAT_ID
+        self.chats = {str(TELEGRAM_CHAT_ID): self.chat_id}
+        self.timestamp = store.get_timestamp(self.chat_id,
+                                             int(clock.time()))
+        self.errors = ErrorAggregator(clock=clock.monotonic)
+        self.snapshot = Snapshot(SeenSet())
+        self.scheduler = Scheduler(RETRY_PERIOD)
+
+    def reload(self):
+        """Применение изменившегося .env между циклами опроса."""
+        if self.watcher is None or not self.watcher.take():
+            return
+        values = read_env(ENV_FILE)
+        try:
+            period = int(values.get('RETRY_PERIOD', RETRY_PERIOD))
+            changed = apply_settings(values, self.bot)
+        except (NoEnvironmentVariable, ValueError) as error:
+            logging.error(f'Новые настройки не применены: {error}')
+            return
+        self.scheduler.set_period(period)
+        current = str(TELEGRAM_CHAT_ID)
+        self.chats[current] = self.chat_id
+        for chat_id in self.chats.keys() - {current}:
+            self.chats.pop(chat_id, None)
+        logging.info(f'Настройки перечитаны, сменились токены: '
+                     f'{", ".join(changed) or "нет"}')
+
+    def poll(self):
+        """Один цикл опроса. Возвращает паузу до следующего."""
+        cycle_started = time.perf_counter()
+        self.reload()
+        try:
+            fetch = self.fetch or get_api_answer
+            response = fetch(query_from(self.timestamp))
+            homeworks = check_response(response)
+            if homeworks:
+                if self.statuses is not None:
+                    self.statuses.update(self.chat_id, homeworks)
+                failed = deliver_changes(self.bot, self.snapshot, self.store,
+                                         homeworks, self.chat_id,
+                                         self.history)
+                self.timestamp = resume_from(
+                    self.timestamp,
+                    response.get('current_date', self.timestamp), failed)
+                self.store.set_timestamp(self.chat_id, self.timestamp)
+            else:
+                logging.debug('Изменений статуса не найденно')
+            self.scheduler.success(self.snapshot.reviewing())
+        except Exception as error:
+            if isinstance(error, WrongAnswer):
+                self.scheduler.failure(error)
+            logging.error(f'Сбой в работе программы: {error}')
+            message = self.errors.report(error,
+                                         f'Сбой в работе программы: {error}')
+            if message and not send_message(self.bot, message):
+                self.errors.forget(error)
+        finally:
+            for _, summary in self.errors.summaries():
+                send_message(self.bot, summary)
+            self.store.flush()
+            metrics.POLL_CYCLE.observe(time.perf_counter() - cycle_started)
+        return self.scheduler.next_delay()
+
+
 def main(): # noqa
     """Основная логика работы бота."""
     try:
@@ -129,40 +288,57 @@ def main(): # noqa
         logging.critical(f'Отсутствует переменная окружения или'
                          f' недоступен эндпоинт: {error}')
         sys.exit(1)
+    from telebot import TeleBot  # type: ignore
+
     bot = TeleBot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    last_message = None
-    while True:
-        try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            if not homeworks:
-                logging.debug('Изменений статуса не найденно')
-                continue
-            homework = homeworks[0]
-            message = parse_status(homework)
-            if last_message != message and send_message(bot, message):
-                last_message = message
-                timestamp = response.get('current_date', timestamp)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(f'Сбой в работе программы: {error}')
-            if last_message != message and send_message(bot, message):
-                last_message = message
-        finally:
-            time.sleep(RETRY_PERIOD)
+    transport.configure_telebot()
+    if metrics.METRICS_PORT:
+        metrics.start_exporter(int(metrics.METRICS_PORT))
+    store = StateStore()
+    fetch = None
+    if RECORD_FILE:
+        from replay import Recorder
+        fetch = Recorder(RECORD_FILE, get_api_answer)
+    history = None
+    if HISTORY_DIR:
+        history = HistoryLog()
+        history.start_compactor()
+    statuses = None
+    if BOT_COMMANDS:
+        statuses = StatusCache(store, histories=[history] if history else ())
+    watcher = None
+    if CONFIG_RELOAD:
+        watcher = FileWatcher([ENV_FILE]).start()
+    poller = Poller(bot, store, fetch, statuses=statuses, history=history,
+                    watcher=watcher)
+    if statuses is not None:
+        register(bot, statuses, poller.chats)
+        start_polling(bot)
+    shutdown = GracefulShutdown()
+    shutdown.install()
+    try:
+        while True:
+            delay = poller.poll()
+            with shutdown.interruptible():
+                time.sleep(delay)
+    except Shutdown:
+        logging.info('Бот остановлен')
+    finally:
+        shutdown.restore()
+        if watcher is not None:
+            watcher.stop()
+        if fetch is not None:
+            fetch.close()
+        if history is not None:
+            history.close()
+        store.close()
 
 
 if __name__ == '__main__':
 
     logging.basicConfig(
         level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        encoding='utf-8',
-        handlers=[
-            logging.StreamHandler(stream=sys.stdout),
-            logging.FileHandler(__file__ + '.log', mode='w', encoding='utf-8')
-        ]
+        handlers=[logs.queue_handler(__file__ + '.log')]
     )
 
     main()
@@ -0,0 +1,111 @@
+import atexit
+import json
+import logging
+import os
+import sys
+
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', 100))
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Формат JSON lines: одна запись — один JSON-объект в строке."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'name': record.name,
+            'message': record.getMessage(),
+        }
+        tenant = getattr(record, 'tenant', None)
+        if tenant is not None:
+            data['tenant'] = tenant
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Прореживание повторяющихся записей уровня ниже WARNING.
+    Из одинаковых записей одного арендатора пропускается первая
+    и далее каждая every-я; к пропущенной записи дописывается число
+    отброшенных повторов. Предупреждения и ошибки не прореживаются.
+    """
+
+    def __init__(self, every=LOG_SAMPLE_EVERY, max_keys=100_000):
+        super().__init__()
+        self.every = every
+        self.max_keys = max_keys
+        self.seen = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.every <= 1:
+            return True
+        key = (getattr(record, 'tenant', None), record.msg)
+        count = self.seen.get(key, 0)
+        if len(self.seen) >= self.max_keys and key not in self.seen:
+            self.seen.clear()
+        self.seen[key] = count + 1
+        if count % self.every:
+            return False
+        if count:
+            record.msg = f'{record.msg} (повторов пропущено: {self.every - 1})'
+        return True
+
+
+def build_formatter(log_format=LOG_FORMAT):
+    """Форматтер по названию: text или json."""
+    if log_format == 'json':
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def build_file_handler(path):
+    """Файловый обработчик с ротацией по размеру или по времени."""
+    import logging.handlers
+
+    if LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8')
+
+
+def stop_listener(listener):
+    """Остановка слушателя очереди; повторный вызов безопасен."""
+    if listener._thread is not None:
+        listener.stop()
+
+
+def queue_handler(path=None, log_format=LOG_FORMAT,
+                  sample_every=LOG_SAMPLE_EVERY):
+    """Обработчик, который только кладёт записи в очередь.
+    Запись в stdout и в файл выполняет QueueListener в отдельном
+    потоке, поэтому цикл опроса не ждёт диска. Слушатель
+    останавливается и дописывает очередь при выходе из процесса.
+    """
+    import logging.handlers
+    import queue
+
+    records = queue.SimpleQueue()
+    formatter = build_formatter(log_format)
+    handlers = [logging.StreamHandler(stream=sys.stdout)]
+    if path:
+        handlers.append(build_file_handler(path))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    listener = logging.handlers.QueueListener(
+        records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_listener, listener)
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(SamplingFilter(sample_every))
+    handler.listener = listener
+    return handler
@@ -0,0 +1,239 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUANTILES = (0.5, 0.99)
+
+
+class Counter:
+    """Счётчик событий с разбивкой по причине."""
+
+    kind = 'counter'
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, cause='', amount=1):
+        """Увеличение счётчика."""
+        with self.lock:
+            self.values[cause] = self.values.get(cause, 0) + amount
+
+    def samples(self):
+        """Пары (имя с метками, значение)."""
+        with self.lock:
+            values = dict(self.values)
+        return [(f'{self.name}{{cause="{cause}"}}' if cause else self.name,
+                 value) for cause, value in sorted(values.items())]
+
+
+class Gauge:
+    """Текущее значение; может вычисляться функцией при чтении."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        """Установка значения."""
+        self.value = value
+
+    def set_function(self, function):
+        """Вычисление значения функцией при каждом чтении."""
+        self.function = function
+
+    def samples(self):
+        """Пары (имя, значение)."""
+        value = self.function() if self.function else self.value
+        return [(self.name, value)]
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        """Учёт одного измерения."""
+        with self.lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        """Замер длительности блока кода."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def quantile(self, q):
+        """Оценка квантиля по корзинам с линейной интерполяцией."""
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and seen + count >= rank:
+                if math.isinf(bound):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound if not math.isinf(bound) else lower
+        return lower
+
+    def samples(self):
+        """Корзины, сумма и количество."""
+        with self.lock:
+            counts, total, summary = list(self.counts), self.count, self.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            edge = '+Inf' if math.isinf(bound) else bound
+            samples.append((f'{self.name}_bucket{{le="{edge}"}}',
+                            cumulative))
+        samples.append((f'{self.name}_sum', round(summary, 6)))
+        samples.append((f'{self.name}_count', total))
+        return samples
+
+    def quantiles(self):
+        """Оценки квантилей QUANTILES: пары (q, значение)."""
+        return [(q, round(self.quantile(q), 6)) for q in QUANTILES]
+
+
+class Registry:
+    """Реестр метрик процесса."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """Добавление метрики; повторная регистрация возвращает прежнюю."""
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, description):
+        """Создание счётчика."""
+        return self.register(Counter(name, description))
+
+    def gauge(self, name, description):
+        """Создание показателя."""
+        return self.register(Gauge(name, description))
+
+    def histogram(self, name, description, buckets=BUCKETS):
+        """Создание гистограммы."""
+        return self.register(Histogram(name, description, buckets))
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus.
+        Оценки квантилей гистограммы выводятся отдельным семейством
+        <имя>_quantile типа gauge: внутри блока histogram допустимы только
+        корзины, сумма и количество.
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name} {value}' for name, value in metric.samples())
+            if metric.kind != 'histogram':
+                continue
+            name = f'{metric.name}_quantile'
+            lines.append(f'# HELP {name} {metric.description}, '
+                         f'оценка квантилей по корзинам')
+            lines.append(f'# TYPE {name} gauge')
+            lines.extend(f'{name}{{quantile="{q}"}} {value}'
+                         for q, value in metric.quantiles())
+        return '\n'.join(lines) + '\n'
+
+    def as_dict(self):
+        """Метрики в виде словаря для JSON, с квантилями гистограмм
+        под именами <имя>_p50 и <имя>_p99.
+        """
+        values = {}
+        for metric in self.metrics.values():
+            values.update(metric.samples())
+            if metric.kind == 'histogram':
+                values.update((f'{metric.name}_p{int(q * 100)}', value)
+                              for q, value in metric.quantiles())
+        return values
+
+
+REGISTRY = Registry()
+API_LATENCY = REGISTRY.histogram(
+    'homework_api_latency_seconds', 'Время ответа API Практикума')
+SEND_LATENCY = REGISTRY.histogram(
+    'homework_send_latency_seconds', 'Время отправки сообщения в Telegram')
+POLL_CYCLE = REGISTRY.histogram(
+    'homework_poll_cycle_seconds', 'Длительность цикла опроса')
+API_ERRORS = REGISTRY.counter(
+    'homework_api_errors_total', 'Ошибки запросов к API Практикума')
+TELEGRAM_ERRORS = REGISTRY.counter(
+    'homework_telegram_errors_total', 'Ошибки отправки в Telegram')
+QUEUE_DEPTH = REGISTRY.gauge(
+    'homework_delivery_queue_depth', 'Сообщений в очереди доставки')
+
+
+def start_exporter(port, host=METRICS_HOST, registry=REGISTRY):
+    """Запуск HTTP-сервера метрик в фоновом потоке.
+    /metrics отдаёт текстовый формат Prometheus, /metrics.json — JSON.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = registry.render().encode()
+                content_type = 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body = json.dumps(registry.as_dict()).encode()
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True,
+                              name='metrics-exporter')
+    thread.start()
+    logging.info(f'Метрики доступны на http://{host}:{server.server_port}'
+                 f'/metrics')
+    return server
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+from exceptions import WrongToken
+from homework import ENDPOINT, TELEGRAM_API_URL
+
+STARTUP_PROBE = os.getenv('STARTUP_PROBE', 'true').lower() in ('1', 'true')
+PROBE_TIMEOUT = float(os.getenv('PROBE_TIMEOUT', 10))
+
+OK, REJECTED, UNKNOWN = 'ok', 'rejected', 'unknown'
+BOT_REJECTED = (401, 404)
+CHAT_REJECTED = (400, 403)
+PRACTICUM_REJECTED = (401, 403)
+
+
+async def check(client, url, rejected, **kwargs):
+    """Один пробный GET-запрос: пара (исход, причина).
+    Отказом считаются только статусы из rejected; сетевые ошибки
+    и остальные статусы означают, что проверить не удалось.
+    """
+    try:
+        response = await client.get(url, **kwargs)
+    except httpx.HTTPError as error:
+        return UNKNOWN, type(error).__name__
+    if response.status_code == 200:
+        return OK, None
+    reason = f'статус {response.status_code}'
+    try:
+        description = response.json().get('description')
+    except (ValueError, AttributeError):
+        description = None
+    if description:
+        reason += f': {description}'
+    if response.status_code in rejected:
+        return REJECTED, reason
+    return UNKNOWN, reason
+
+
+class ProbeReport:
+    """Итог проверки при запуске: исправные арендаторы, арендаторы
+    на карантин с причинами, непроверенные (нет ответа или сбой)
+    и отклонённые чаты подписчиков по ключам доставки.
+    """
+
+    def __init__(self):
+        self.healthy = []
+        self.quarantined = {}
+        self.unverified = {}
+        self.rejected_subscribers = {}
+
+    def add(self, tenant, checks, subscribers=None):
+        """Учёт арендатора по исходам проверок {название: (исход,
+        причина)} и проверок чатов подписчиков {чат: (исход, причина)}.
+        Отклонённый чат подписчика не отправляет арендатора на карантин.
+        """
+        rejected = [f'{name}: {reason}' for name, (status, reason)
+                    in checks.items() if status == REJECTED]
+        if rejected:
+            self.quarantined[tenant.key] = '; '.join(rejected)
+            return
+        self.healthy.append(tenant)
+        checks = {**checks, **{f'подписчик {chat_id}': result for chat_id,
+                               result in (subscribers or {}).items()}}
+        unknown = [f'{name}: {reason}' for name, (status, reason)
+                   in checks.items() if status == UNKNOWN]
+        if unknown:
+            self.unverified[tenant.key] = '; '.join(unknown)
+        for chat_id, (status, reason) in (subscribers or {}).items():
+            if status == REJECTED:
+                self.rejected_subscribers[
+                    tenant.delivery_key(chat_id)] = reason
+
+    def summary(self):
+        """Сводка для журнала и командной строки."""
+        return {'healthy': len(self.healthy),
+                'quarantined': self.quarantined,
+                'unverified': self.unverified,
+                'rejected_subscribers': self.rejected_subscribers}
+
+
+def start_checks(client, telegram_token, tenants, semaphore):
+    """Запуск проверок чатов (по разу на чат получателя) и токенов
+    Практикума арендаторов; одновременно их выполняется не больше,
+    чем позволяет semaphore. Возвращает словари задач по чату
+    и по ключу арендатора.
+    """
+    chat_url = TELEGRAM_API_URL.format(token=telegram_token,
+                                       method='getChat')
+
+    async def limited(url, rejected, **kwargs):
+        async with semaphore:
+            return await check(client, url, rejected, **kwargs)
+
+    chats = {}
+    practicum = {}
+    for tenant in tenants:
+        for chat_id in tenant.recipients:
+            if str(chat_id) not in chats:
+                chats[str(chat_id)] = asyncio.create_task(limited(
+                    chat_url, CHAT_REJECTED, params={'chat_id': chat_id}))
+        practicum[tenant.key] = asyncio.create_task(limited(
+            ENDPOINT, PRACTICUM_REJECTED, headers=tenant.headers,
+            params={'from_date': int(time.time())}))
+    return chats, practicum
+
+
+async def probe(client, telegram_token, tenants, concurrency,
+                timeout=PROBE_TIMEOUT):
+    """Параллельная проверка токена бота (getMe), чатов арендаторов
+    и их подписчиков (getChat, по разу на чат) и токенов Практикума,
+    не дольше timeout секунд на всё. Одновременно выполняется не больше
+    concurrency запросов, так что время старта зависит от числа
+    арендаторов, делённого на concurrency, и ограничено timeout.
+    Отклонённый токен бота — исключение WrongToken: без него движок
+    бесполезен. Арендатор с отклонённым чатом или токеном Практикума
+    попадает на карантин, отклонённый чат подписчика только отмечается
+    в отчёте; не ответившие вовремя тоже только отмечаются.
+    """
+    bot = asyncio.create_task(check(
+        client, TELEGRAM_API_URL.format(token=telegram_token,
+                                        method='getMe'), BOT_REJECTED))
+    chats, practicum = start_checks(client, telegram_token, tenants,
+                                    asyncio.Semaphore(concurrency))
+    tasks = [bot, *chats.values(), *practicum.values()]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    def outcome(task):
+        if task in done:
+            return task.result()
+        return UNKNOWN, f'нет ответа за {timeout:g} с'
+
+    status, reason = outcome(bot)
+    if status == REJECTED:
+        raise WrongToken(f'Telegram отклонил токен бота: {reason}')
+    report = ProbeReport()
+    for tenant in tenants:
+        report.add(tenant, {'чат': outcome(chats[str(tenant.chat_id)]),
+                            'Практикум': outcome(practicum[tenant.key])},
+                   {chat_id: outcome(chats[str(chat_id)])
+                    for chat_id in tenant.recipients
+                    if chat_id != tenant.chat_id})
+    return report
+
+
+def main():
+    """Проверка токенов из .env одиночного бота (homework.py)."""
+    from engine import Tenant
+    from homework import PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_TOKEN
+    import transport
+
+    async def run():
+        async with transport.build_async_client(4) as client:
+            return await probe(client, TELEGRAM_TOKEN,
+                               [Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)],
+                               concurrency=4)
+
+    try:
+        report = asyncio.run(run())
+    except WrongToken as error:
+        sys.stderr.write(f'{error}\n')
+        return 1
+    sys.stdout.write(json.dumps(report.summary(), ensure_ascii=False,
+                                indent=2) + '\n')
+    return 1 if report.quarantined else 0
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(level=logging.WARNING)
+
+    sys.exit(main())
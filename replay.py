@@ -0,0 +1,186 @@
+import argparse
+import gzip
+import json
+import logging
+import sys
+import time
+
+import environment  # noqa: F401
+import exceptions
+from state import StateStore
+
+ERRORS = {
+    name: getattr(exceptions, name)
+    for name in ('WrongAnswer', 'RetryLater', 'CircuitOpen')
+}
+
+
+class VirtualClock:
+    """Часы с виртуальным временем: sleep() только сдвигает время."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        """Текущее виртуальное время в секундах эпохи."""
+        return self.now
+
+    def monotonic(self):
+        """Монотонное время, совпадающее с виртуальным."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Мгновенный сдвиг времени на seconds секунд."""
+        self.now += max(seconds, 0)
+
+
+def open_records(path, mode='rt'):
+    """Файл записи; при расширении .gz — сжатый."""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Recorder:
+    """Запись ответов fetch (обычно get_api_answer) в файл JSON Lines.
+    Используется вместо fetch: каждый ответ или ошибка сохраняется одной
+    строкой с временем запроса и from_date. Функцию передаёт вызывающий,
+    чтобы запросы шли с заголовками того модуля, который её вызывает.
+    """
+
+    def __init__(self, path, fetch, clock=time):
+        self.file = open_records(path, 'at')
+        self.fetch = fetch
+        self.clock = clock
+
+    def write(self, record):
+        """Сохранение одной записи."""
+        self.file.write(json.dumps(record, ensure_ascii=False,
+                                   separators=(',', ':')) + '\n')
+        self.file.flush()
+
+    def __call__(self, timestamp):
+        record = {'t': round(self.clock.time(), 3), 'from_date': timestamp}
+        try:
+            response = self.fetch(timestamp)
+        except Exception as error:
+            record['error'] = type(error).__name__
+            record['message'] = str(error)
+            if getattr(error, 'retry_after', None) is not None:
+                record['retry_after'] = error.retry_after
+            self.write(record)
+            raise
+        record['response'] = response
+        self.write(record)
+        return response
+
+    def close(self):
+        """Закрытие файла записи."""
+        self.file.close()
+
+
+def load_records(path):
+    """Записи из файла в порядке времени."""
+    with open_records(path) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    return sorted(records, key=lambda record: record['t'])
+
+
+class Replayer:
+    """Источник ответов для Poller из записанного трафика.
+    На запрос в виртуальный момент T отдаётся последняя запись
+    не позже T, как если бы сервер находился в том же состоянии.
+    """
+
+    def __init__(self, records, clock):
+        self.records = records
+        self.clock = clock
+        self.position = 0
+        self.calls = 0
+
+    @property
+    def finished(self):
+        """Виртуальное время прошло последнюю запись."""
+        return self.clock.time() > self.records[-1]['t']
+
+    def __call__(self, timestamp):
+        now = self.clock.time()
+        while (self.position + 1 < len(self.records)
+               and self.records[self.position + 1]['t'] <= now):
+            self.position += 1
+        self.calls += 1
+        record = self.records[self.position]
+        if 'error' in record:
+            error = ERRORS.get(record['error'], exceptions.WrongAnswer)
+            if issubclass(error, exceptions.RetryLater):
+                raise error(record['message'], record.get('retry_after'))
+            raise error(record['message'])
+        return record['response']
+
+
+class RecordingBot:
+    """Заглушка TeleBot, запоминающая отправленные сообщения."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.messages = []
+
+    def send_message(self, chat_id, text):
+        """Запоминание сообщения с виртуальным временем отправки."""
+        self.messages.append((self.clock.time(), text))
+
+
+def replay(records, messages=False):
+    """Прогон записанного трафика через цикл опроса main()
+    с виртуальными часами. Возвращает сводку прогона, а при
+    messages=True — и отправленные сообщения.
+    """
+    from homework import Poller
+
+    clock = VirtualClock(records[0]['t'])
+    bot = RecordingBot(clock)
+    source = Replayer(records, clock)
+    started = time.perf_counter()
+    with StateStore(':memory:') as store:
+        poller = Poller(bot, store, fetch=source, clock=clock,
+                        chat_id='replay')
+        while not source.finished:
+            clock.sleep(poller.poll())
+    wall_seconds = time.perf_counter() - started
+    virtual_seconds = clock.time() - records[0]['t']
+    result = {
+        'records': len(records),
+        'cycles': source.calls,
+        'messages': len(bot.messages),
+        'virtual_seconds': round(virtual_seconds, 3),
+        'wall_seconds': round(wall_seconds, 3),
+        'speedup': round(virtual_seconds / max(wall_seconds, 1e-9)),
+    }
+    if messages:
+        result['sent'] = [{'t': moment, 'text': text}
+                          for moment, text in bot.messages]
+    return result
+
+
+def main(argv=None):
+    """Воспроизведение записи из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Воспроизведение записанных ответов API')
+    parser.add_argument('path', help='файл записи (RECORD_FILE)')
+    parser.add_argument('--messages', action='store_true',
+                        help='вывести отправленные сообщения')
+    args = parser.parse_args(argv)
+    records = load_records(args.path)
+    if not records:
+        sys.stderr.write('Запись пуста\n')
+        return 1
+    result = replay(records, args.messages)
+    sys.stdout.write(json.dumps(result, ensure_ascii=False, indent=2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(level=logging.WARNING)
+
+    sys.exit(main())
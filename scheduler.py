@@ -0,0 +1,101 @@
+import hashlib
+import os
+import random
+import time
+
+REVIEWING_PERIOD = int(os.getenv('REVIEWING_PERIOD', 120))
+MAX_BACKOFF = int(os.getenv('MAX_BACKOFF', 3600))
+JITTER = float(os.getenv('JITTER', 0.2))
+RETRY_LATER_STATUSES = (429, 503)
+
+
+def parse_retry_after(value, now=None):
+    """Число секунд из заголовка Retry-After (секунды или HTTP-дата)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    import email.utils
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0, int(date.timestamp() - now))
+
+
+class Scheduler:
+    """Расчёт паузы до следующего запроса к API для одного арендатора.
+    Пока работа на проверке, опрос учащается; при повторных ошибках API
+    пауза растёт экспоненциально со случайным разбросом; Retry-After
+    от API соблюдается в любом случае.
+    """
+
+    __slots__ = ('period', 'reviewing_period', 'max_backoff', 'jitter',
+                 'failures', 'retry_after', 'reviewing',
+                 'base_reviewing_period', 'base_max_backoff')
+
+    def __init__(self, period, reviewing_period=REVIEWING_PERIOD,
+                 max_backoff=MAX_BACKOFF, jitter=JITTER):
+        self.base_reviewing_period = reviewing_period
+        self.base_max_backoff = max_backoff
+        self.jitter = jitter
+        self.failures = 0
+        self.retry_after = None
+        self.reviewing = False
+        self.set_period(period)
+
+    def set_period(self, period):
+        """Смена основного периода опроса без сброса счётчика ошибок.
+        Период проверки и предел паузы ограничиваются значениями,
+        заданными при создании.
+        """
+        self.period = period
+        self.reviewing_period = min(self.base_reviewing_period, period)
+        self.max_backoff = max(self.base_max_backoff, period)
+
+    def success(self, reviewing=False):
+        """Учёт успешного ответа API.
+        reviewing — есть ли у арендатора работа на проверке. Берётся
+        из снимка (Snapshot.reviewing), а не из ответа: API отдаёт
+        только работы, обновлённые после from_date, и работа на
+        проверке пропадает из ответов задолго до конца проверки.
+        """
+        self.failures = 0
+        self.retry_after = None
+        self.reviewing = reviewing
+
+    def failure(self, error):
+        """Учёт ошибки запроса к API."""
+        self.failures += 1
+        self.retry_after = getattr(error, 'retry_after', None)
+
+    def postpone(self, error):
+        """Учёт пропущенного запроса (например, при разомкнутом
+        предохранителе): соблюдается retry_after ошибки, но счётчик
+        ошибок не растёт, так что пауза не удваивается.
+        """
+        self.retry_after = getattr(error, 'retry_after', None)
+
+    def next_delay(self):
+        """Пауза в секундах до следующего запроса."""
+        if self.failures:
+            backoff = min(self.max_backoff,
+                          self.period * 2 ** (self.failures - 1))
+            spread = backoff * self.jitter
+            delay = backoff + random.uniform(-spread, spread)
+        elif self.reviewing:
+            delay = self.reviewing_period
+        else:
+            delay = self.period
+        return max(delay, self.retry_after or 0)
+
+    @staticmethod
+    def phase(key, period):
+        """Постоянный сдвиг первого опроса арендатора внутри периода,
+        чтобы запросы разных арендаторов не шли одной пачкой.
+        """
+        digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % 1000 / 1000 * period
@@ -0,0 +1,96 @@
+import bisect
+import hashlib
+import logging
+import os
+import signal
+import subprocess
+import sys
+
+WORKER_COUNT = int(os.getenv('WORKER_COUNT', 1))
+VIRTUAL_NODES = int(os.getenv('VIRTUAL_NODES', 128))
+
+
+def stable_hash(value):
+    """Хеш строки, одинаковый во всех процессах и запусках."""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def worker_index():
+    """Номер текущего воркера: WORKER_INDEX или номер дино Heroku
+    из DYNO (worker.1 — воркер 0).
+    """
+    index = os.getenv('WORKER_INDEX')
+    if index is not None:
+        return int(index)
+    dyno = os.getenv('DYNO', '')
+    if '.' in dyno and dyno.rsplit('.', 1)[1].isdigit():
+        return int(dyno.rsplit('.', 1)[1]) - 1
+    return 0
+
+
+class HashRing:
+    """Кольцо согласованного хеширования арендаторов по воркерам.
+    У каждого воркера virtual_nodes точек на кольце, поэтому при
+    изменении числа воркеров переезжает примерно 1/N арендаторов.
+    """
+
+    def __init__(self, workers, virtual_nodes=VIRTUAL_NODES):
+        if workers < 1:
+            raise ValueError('Число воркеров должно быть положительным')
+        points = sorted(
+            (stable_hash(f'worker-{worker}#{node}'), worker)
+            for worker in range(workers)
+            for node in range(virtual_nodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.workers = [worker for _, worker in points]
+
+    def owner(self, key):
+        """Воркер, которому принадлежит ключ."""
+        index = bisect.bisect(self.hashes, stable_hash(key))
+        return self.workers[index % len(self.hashes)]
+
+
+def shard_tenants(tenants, index, count, virtual_nodes=VIRTUAL_NODES):
+    """Арендаторы, которых обслуживает воркер index из count."""
+    if not 0 <= index < count:
+        raise ValueError(f'Номер воркера {index} вне диапазона 0..{count-1}')
+    if count == 1:
+        return list(tenants)
+    ring = HashRing(count, virtual_nodes)
+    return [tenant for tenant in tenants if ring.owner(tenant.key) == index]
+
+
+def main(argv=None):
+    """Локальный запуск count воркеров движка в отдельных процессах.
+    SIGTERM и SIGINT пересылаются воркерам, каждый из которых
+    завершается штатно.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else WORKER_COUNT
+    engine = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'engine.py')
+    workers = [
+        subprocess.Popen(
+            [sys.executable, engine],
+            env={**os.environ, 'WORKER_INDEX': str(index),
+                 'WORKER_COUNT': str(count)})
+        for index in range(count)
+    ]
+
+    def forward(signum, frame):
+        for worker in workers:
+            worker.send_signal(signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    logging.info(f'Запущено воркеров: {count}')
+    return max(worker.wait() for worker in workers)
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(level=logging.INFO)
+
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import logging
+import os
+import signal
+from contextlib import contextmanager
+
+from exceptions import Shutdown
+
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 20))
+SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class GracefulShutdown:
+    """Остановка синхронного цикла бота по сигналу.
+    Сигнал во время ожидания прерывает его сразу; сигнал во время
+    запроса или отправки дожидается конца цикла, чтобы сообщение
+    не оборвалось на полпути. Повторный сигнал останавливает бота
+    немедленно.
+    """
+
+    def __init__(self, signals=SIGNALS):
+        self.signals = signals
+        self.requested = False
+        self.waiting = False
+        self.previous = {}
+
+    def install(self):
+        """Установка обработчиков сигналов."""
+        for signum in self.signals:
+            try:
+                self.previous[signum] = signal.signal(signum, self.handle)
+            except ValueError:
+                logging.warning('Обработчики сигналов можно установить '
+                                'только в главном потоке')
+                return
+
+    def restore(self):
+        """Возврат прежних обработчиков сигналов."""
+        for signum, handler in self.previous.items():
+            signal.signal(signum, handler)
+        self.previous = {}
+
+    def handle(self, signum, frame):
+        """Обработчик сигнала."""
+        logging.info(f'Получен сигнал {signal.Signals(signum).name}, '
+                     f'бот завершает работу')
+        if self.waiting or self.requested:
+            raise Shutdown(signum)
+        self.requested = True
+
+    @contextmanager
+    def interruptible(self):
+        """Ожидание, которое прерывается сигналом остановки."""
+        if self.requested:
+            raise Shutdown()
+        self.waiting = True
+        try:
+            yield
+        finally:
+            self.waiting = False
+
+
+def install_async(loop, callback, signals=SIGNALS):
+    """Установка обработчиков сигналов в цикле событий asyncio."""
+    for signum in signals:
+        loop.add_signal_handler(signum, callback)
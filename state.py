@@ -0,0 +1,206 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+STATE_FILE = os.getenv('STATE_FILE', 'homework_state.sqlite3')
+FLUSH_SIZE = int(os.getenv('STATE_FLUSH_SIZE', 100))
+FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 5))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timestamps (
+    tenant TEXT PRIMARY KEY,
+    from_date INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    tenant TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (tenant, homework)
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    tenant TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    name TEXT,
+    status TEXT,
+    updated TEXT,
+    PRIMARY KEY (tenant, homework)
+);
+"""
+
+
+class StateStore:
+    """Хранилище состояния бота между перезапусками.
+    Хранит последний current_date арендатора, последнее доставленное
+    сообщение и последний известный статус по каждой работе (историю
+    смен статусов ведёт history.HistoryLog). Записи копятся в памяти
+    и сбрасываются в SQLite одной транзакцией с fsync
+    (synchronous=FULL). Пачка забирается под блокировкой, а пишется
+    без неё, отдельным соединением и под своей блокировкой записи:
+    чтение и новые записи не ждут fsync, а записываемую пачку видят.
+    При autoflush=False запись никогда не сбрасывается в вызывающем
+    потоке: так хранилище используют из цикла событий, а flush()
+    вызывается отдельно вне его.
+    """
+
+    def __init__(self, path=STATE_FILE, flush_size=FLUSH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, autoflush=True):
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.autoflush = autoflush
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=FULL')
+        self.connection.executescript(SCHEMA)
+        self.reader = self.connection
+        if path != ':memory:':
+            self.reader = sqlite3.connect(path, check_same_thread=False)
+        self.pending = self.empty_batch()
+        self.flushing = self.empty_batch()
+        self.last_flush = time.monotonic()
+
+    @staticmethod
+    def empty_batch():
+        """Пустая пачка записей: current_date, сообщения и статусы."""
+        return {'timestamps': {}, 'messages': {}, 'statuses': {}}
+
+    def cached(self, kind, key):
+        """Значение из накопленной или записываемой пачки; пара
+        (найдено, значение). Вызывается под self.lock.
+        """
+        for batch in (self.pending, self.flushing):
+            if key in batch[kind]:
+                return True, batch[kind][key]
+        return False, None
+
+    def get_timestamp(self, tenant, default=None):
+        """Последний сохранённый current_date арендатора."""
+        with self.lock:
+            found, value = self.cached('timestamps', tenant)
+            if found:
+                return value
+            row = self.reader.execute(
+                'SELECT from_date FROM timestamps WHERE tenant = ?',
+                (tenant,)).fetchone()
+        return row[0] if row else default
+
+    def load_timestamps(self):
+        """Все сохранённые current_date одним запросом."""
+        with self.lock:
+            timestamps = dict(self.reader.execute(
+                'SELECT tenant, from_date FROM timestamps'))
+            timestamps.update(self.flushing['timestamps'])
+            timestamps.update(self.pending['timestamps'])
+        return timestamps
+
+    def set_timestamp(self, tenant, current_date):
+        """Запоминание current_date арендатора."""
+        with self.lock:
+            self.pending['timestamps'][tenant] = current_date
+        self.maybe_flush()
+
+    def get_message(self, tenant, homework):
+        """Последнее доставленное сообщение по работе."""
+        key = (tenant, str(homework))
+        with self.lock:
+            found, value = self.cached('messages', key)
+            if found:
+                return value
+            row = self.reader.execute(
+                'SELECT message FROM messages '
+                'WHERE tenant = ? AND homework = ?', key).fetchone()
+        return row[0] if row else None
+
+    def set_message(self, tenant, homework, message):
+        """Запоминание доставленного сообщения по работе."""
+        with self.lock:
+            self.pending['messages'][(tenant, str(homework))] = message
+        self.maybe_flush()
+
+    def set_status(self, tenant, homework, name, status, updated):
+        """Запоминание последнего статуса работы."""
+        record = (tenant, str(homework), name, status, updated)
+        with self.lock:
+            self.pending['statuses'][record[:2]] = record
+        self.maybe_flush()
+
+    def load_statuses(self, tenant):
+        """Последние статусы работ арендатора: кортежи
+        (homework, name, status, updated).
+        """
+        with self.lock:
+            rows = {row[0]: row for row in self.reader.execute(
+                'SELECT homework, name, status, updated FROM statuses '
+                'WHERE tenant = ?', (tenant,))}
+            for batch in (self.flushing, self.pending):
+                for (owner, homework), record in batch['statuses'].items():
+                    if owner == tenant:
+                        rows[homework] = record[1:]
+        return list(rows.values())
+
+    def due(self):
+        """Пора ли сбросить записи: набралась пачка или прошёл интервал."""
+        with self.lock:
+            pending = sum(map(len, self.pending.values()))
+            return (pending >= self.flush_size or time.monotonic()
+                    - self.last_flush >= self.flush_interval)
+
+    def maybe_flush(self):
+        """Сброс накопленных записей по размеру пачки или по времени."""
+        if self.autoflush and self.due():
+            self.flush()
+
+    def flush(self):
+        """Запись накопленных изменений одной транзакцией.
+        Под self.lock пачка только подменяется пустой; сама запись
+        с fsync идёт под write_lock. При ошибке пачка возвращается
+        в накопленные записи, более новые значения сохраняются.
+        """
+        with self.write_lock:
+            with self.lock:
+                self.last_flush = time.monotonic()
+                if not any(self.pending.values()):
+                    return
+                batch = self.flushing = self.pending
+                self.pending = self.empty_batch()
+            messages = [(tenant, homework, message) for (tenant, homework),
+                        message in batch['messages'].items()]
+            try:
+                with self.connection:
+                    self.connection.executemany(
+                        'INSERT OR REPLACE INTO timestamps VALUES (?, ?)',
+                        list(batch['timestamps'].items()))
+                    self.connection.executemany(
+                        'INSERT OR REPLACE INTO messages VALUES (?, ?, ?)',
+                        messages)
+                    self.connection.executemany(
+                        'INSERT OR REPLACE INTO statuses '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        list(batch['statuses'].values()))
+            except sqlite3.Error as error:
+                logging.error(f'Ошибка сохранения состояния: {error}')
+                with self.lock:
+                    for kind, values in self.pending.items():
+                        batch[kind].update(values)
+                    self.pending = batch
+                    self.flushing = self.empty_batch()
+                return
+            with self.lock:
+                self.flushing = self.empty_batch()
+
+    def close(self):
+        """Сброс изменений и закрытие базы."""
+        self.flush()
+        if self.reader is not self.connection:
+            self.reader.close()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
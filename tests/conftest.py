@@ -53,3 +53,6 @@ pytest_timeout.write = write_timeout_reasons
 os.environ['PRACTICUM_TOKEN'] = 'sometoken'
 os.environ['TELEGRAM_TOKEN'] = '1234:abcdefg'
 os.environ['TELEGRAM_CHAT_ID'] = '12345'
+os.environ['STATE_FILE'] = ':memory:'
+# журнал истории нужен только тестам, которые создают его в tmp_path
+os.environ['HISTORY_DIR'] = ''
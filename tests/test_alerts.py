@@ -0,0 +1,73 @@
+from alerts import ErrorAggregator, normalise
+from exceptions import WrongAnswer
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestErrorAggregator:
+
+    def test_normalise_keeps_status_codes(self):
+        assert normalise('Статус не ОК 502') == 'Статус не ОК 502'
+        assert (normalise('timeout=30.5 at 0x7f3a, ts 1700000000')
+                == normalise('timeout=12.0 at 0x1b2c, ts 1700000600'))
+
+    def test_repeats_are_suppressed_within_window(self):
+        clock = Clock()
+        errors = ErrorAggregator(window=3600, clock=clock)
+        timeout, bad_gateway = TimeoutError('timeout'), WrongAnswer('502')
+        sent = [errors.report(error, str(error))
+                for error in (timeout, bad_gateway) * 3]
+        assert sent == ['timeout', '502', None, None, None, None], (
+            'Чередующиеся ошибки должны сообщаться один раз за окно.'
+        )
+        assert errors.summaries() == []
+
+        clock.now = 3600
+        assert sorted(errors.summaries()) == [
+            (None, 'Ошибка повторилась ×2 за последний час: 502'),
+            (None, 'Ошибка повторилась ×2 за последний час: timeout'),
+        ]
+        clock.now = 7200
+        assert errors.summaries() == []
+        assert len(errors) == 0, 'Ошибки без повторов забываются.'
+        assert errors.report(timeout, 'timeout') == 'timeout'
+
+    def test_report_after_window_includes_repeats(self):
+        clock = Clock()
+        errors = ErrorAggregator(window=600, clock=clock)
+        error = WrongAnswer('502')
+        errors.report(error, '502')
+        errors.report(error, '502')
+        clock.now = 600
+        assert errors.report(error, '502') == (
+            'Ошибка повторилась ×2 за последние 10 мин: 502'
+        )
+
+    def test_scopes_are_independent(self):
+        errors = ErrorAggregator(clock=Clock())
+        error = WrongAnswer('502')
+        assert errors.report(error, '502', 'first') == '502'
+        assert errors.report(error, '502', 'second') == '502'
+
+    def test_forget_allows_resend(self):
+        errors = ErrorAggregator(clock=Clock())
+        error = WrongAnswer('502')
+        errors.report(error, '502')
+        errors.forget(error)
+        assert errors.report(error, '502') == '502'
+
+    def test_keys_are_bounded(self):
+        errors = ErrorAggregator(max_keys=2, clock=Clock())
+        for code in ('500', '502', '503'):
+            errors.report(WrongAnswer(code), code)
+        assert len(errors) == 2
+        assert errors.report(WrongAnswer('500'), '500') == '500', (
+            'Вытесненная ошибка сообщается заново.'
+        )
@@ -0,0 +1,33 @@
+import json
+
+from benchmarks import memory, pipeline
+
+
+class TestBenchmarks:
+
+    def test_pipeline_report(self, homework_module, tmp_path):
+        endpoint = homework_module.ENDPOINT
+        output = tmp_path / 'bench.json'
+        pipeline.main(['--iterations', '5', '--payload-size', '3',
+                       '--send-limit', '2', '--output', str(output)])
+        result = json.loads(output.read_text())
+        stages = result['stages']
+        assert stages['get_api_answer']['count'] == 5
+        assert stages['parse_status']['count'] == 15
+        assert stages['send_message']['count'] == 10
+        assert stages['send_message']['errors'] == 0
+        assert {'p50_ms', 'p99_ms', 'throughput_per_s'} <= set(
+            stages['get_api_answer'])
+        assert homework_module.ENDPOINT == endpoint, (
+            'Бенчмарк должен вернуть настройки homework на место.'
+        )
+
+    def test_memory_report(self, tmp_path):
+        output = tmp_path / 'memory.json'
+        memory.main(['--tenants', '200', '--homeworks', '2',
+                     '--output', str(output)])
+        row, = json.loads(output.read_text())['results']
+        assert row['tenants'] == 200
+        assert row['compact_bytes_per_tenant'] < row['naive_bytes_per_tenant'], (
+            'Компактное состояние должно занимать меньше памяти.'
+        )
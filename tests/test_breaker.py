@@ -0,0 +1,60 @@
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+
+    def make_breaker(self):
+        clock = Clock()
+        return CircuitBreaker('test', failure_threshold=3, reset_timeout=60,
+                              clock=clock), clock
+
+    def test_opens_after_threshold(self):
+        breaker, _ = self.make_breaker()
+        for _ in range(2):
+            breaker.failure()
+        assert breaker.allow() and breaker.state == CLOSED
+        breaker.success()
+        for _ in range(2):
+            breaker.failure()
+        assert breaker.state == CLOSED, 'Успех должен сбрасывать счётчик.'
+        breaker.failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.remaining == 60
+
+    def test_half_open_allows_single_probe(self):
+        breaker, clock = self.make_breaker()
+        breaker.open()
+        clock.now = 60
+        assert breaker.allow() and breaker.state == HALF_OPEN
+        assert not breaker.allow(), 'Пробный вызов должен быть один.'
+        breaker.success()
+        assert breaker.state == CLOSED and breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        breaker, clock = self.make_breaker()
+        breaker.open()
+        clock.now = 60
+        assert breaker.allow()
+        breaker.failure()
+        assert breaker.state == OPEN and not breaker.allow()
+        assert breaker.remaining == 60
+
+    def test_lost_probe_is_replaced(self):
+        breaker, clock = self.make_breaker()
+        breaker.open()
+        clock.now = 60
+        assert breaker.allow()
+        clock.now = 120
+        assert breaker.allow(), (
+            'Пробный вызов без результата не должен блокировать навсегда.'
+        )
@@ -0,0 +1,107 @@
+from changes import (
+    SeenSet, Snapshot, decode_state, encode_state, parse_date, query_from,
+    resume_from
+)
+
+
+def homework(id, status, date_updated):
+    return {'id': id, 'homework_name': f'hw{id}.zip', 'status': status,
+            'date_updated': date_updated}
+
+
+class TestSnapshot:
+
+    def test_every_transition_is_reported_once(self):
+        snapshot = Snapshot()
+        homeworks = [
+            homework(2, 'reviewing', '2021-04-11T10:31:09Z'),
+            homework(1, 'approved', '2021-04-10T10:31:09Z'),
+        ]
+        events = snapshot.diff(homeworks)
+        assert [event.key for event in events] == [1, 2], (
+            'События должны идти от старых работ к новым.'
+        )
+        for event in events:
+            snapshot.commit(event)
+        assert snapshot.diff(homeworks) == []
+
+        homeworks[0] = homework(2, 'approved', '2021-04-12T10:31:09Z')
+        assert [event.key for event in snapshot.diff(homeworks)] == [2]
+
+    def test_uncommitted_event_is_repeated(self):
+        snapshot = Snapshot()
+        homeworks = [homework(1, 'approved', '2021-04-10T10:31:09Z')]
+        assert len(snapshot.diff(homeworks)) == 1
+        assert len(snapshot.diff(homeworks)) == 1, (
+            'Недоставленное событие должно повториться.'
+        )
+
+    def test_large_history(self):
+        snapshot = Snapshot()
+        homeworks = [homework(i, 'approved', str(i)) for i in range(50000)]
+        for event in snapshot.diff(homeworks):
+            snapshot.commit(event)
+        assert len(snapshot) == 50000
+        assert snapshot.diff(homeworks) == []
+
+    def test_state_is_compact(self):
+        state = encode_state(homework(1, 'rejected', '2021-04-11T10:31:09Z'))
+        assert isinstance(state, int), 'Состояние хранится целым числом.'
+        assert decode_state(state) == ('rejected', 1618137069)
+        assert decode_state(encode_state(
+            homework(1, 'unknown', '2021-04-11T10:31:09Z')))[0] is None
+
+    def test_utc_suffix_is_parsed(self):
+        assert parse_date('2021-04-11T10:31:09Z') == 1618137069, (
+            'Суффикс Z разбирается и в Python до 3.11.'
+        )
+        assert parse_date('2021-04-11T10:31:09z') == 1618137069
+        assert parse_date('2021-04-11T13:31:09+03:00') == 1618137069
+
+    def test_unparsed_dates_stay_distinct(self):
+        first = encode_state(homework(1, 'approved', 'yesterday'))
+        second = encode_state(homework(1, 'approved', 'today'))
+        assert first != second
+        assert encode_state(homework(1, 'approved', ['today'])) != second
+
+    def test_seen_events_are_not_repeated(self):
+        seen = SeenSet()
+        snapshot = Snapshot(seen, 'tenant')
+        reviewing = homework(1, 'reviewing', '2021-04-10T10:31:09Z')
+        approved = homework(1, 'approved', '2021-04-11T10:31:09Z')
+        for response in ([reviewing, reviewing], [approved]):
+            events = snapshot.diff(response)
+            assert len(events) == 1, 'Дубликаты в ответе отсеиваются.'
+            snapshot.commit(events[0])
+        assert snapshot.diff([reviewing]) == [], (
+            'Устаревшее состояние из окна перекрытия не должно '
+            'отправляться повторно.'
+        )
+        assert Snapshot(seen, 'other').diff([reviewing]), (
+            'Множество seen разделяется по областям.'
+        )
+
+    def test_discarded_event_is_retried(self):
+        snapshot = Snapshot(SeenSet())
+        event, = snapshot.diff([homework(1, 'approved', '1')])
+        snapshot.commit(event)
+        snapshot.discard(event)
+        assert snapshot.diff([homework(1, 'approved', '1')]) == [event]
+
+    def test_seen_set_is_bounded(self):
+        seen = SeenSet(size=2)
+        for item in range(3):
+            seen.add(item)
+        assert len(seen) == 2 and 0 not in seen
+
+    def test_sync_window(self):
+        assert query_from(1000, overlap=300) == 700
+        assert query_from(100, overlap=300) == 0
+        failed = Snapshot().diff([
+            homework(1, 'approved', '2021-04-11T10:31:09Z')])
+        assert resume_from(1, 2000000000) == 2000000000
+        assert resume_from(1, 2000000000, failed) == 1618137069, (
+            'Окно должно начинаться с самого раннего недоставленного события.'
+        )
+        unparsed = Snapshot().diff([homework(1, 'approved', 'yesterday')])
+        assert resume_from(1, 2000000000, unparsed) == 1
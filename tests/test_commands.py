@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+from commands import StatusCache, parse_command, register
+from history import HistoryLog
+from replay import RecordingBot, VirtualClock
+from state import StateStore
+
+
+def homework(id, status, date_updated):
+    return {'id': id, 'homework_name': f'hw{id}.zip', 'status': status,
+            'date_updated': date_updated}
+
+
+class FakeBot:
+
+    def __init__(self):
+        self.handlers = []
+        self.sent = []
+
+    def message_handler(self, commands):
+        def decorator(handler):
+            self.handlers.append((commands, handler))
+            return handler
+        return decorator
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class TestCommands:
+
+    def test_answers_come_from_cache(self, tmp_path):
+        log = HistoryLog(str(tmp_path))
+        cache = StatusCache(StateStore(':memory:'), histories=[log])
+        first = [homework(1, 'reviewing', '2021-04-10T10:31:09Z')]
+        second = [homework(1, 'approved', '2021-04-11T10:31:09Z'),
+                  homework(2, 'reviewing', '2021-04-12T09:00:00Z')]
+        for homeworks in (first, second):
+            cache.update('42', homeworks)
+            for work in homeworks:
+                log.append('42', work)
+        status = cache.answer('42', 'status')
+        assert 'hw1.zip — Работа проверена' in status
+        assert '(2021-04-11 10:31)' in status
+        assert cache.answer('42', 'pending') == (
+            'На проверке:\n• hw2.zip (с 2021-04-12 09:00)'
+        )
+        history = cache.answer('42', 'history').splitlines()
+        assert len(history) == 4, 'История содержит каждую смену статуса.'
+        assert 'на проверку' in history[1] and 'Ура!' in history[2]
+        assert cache.answer(None, 'status').startswith('Для этого чата')
+        assert cache.answer('7', 'pending') == 'Работ на проверке нет.'
+
+    def test_cache_survives_restart_and_eviction(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        with StateStore(path) as store:
+            cache = StatusCache(store, size=1)
+            cache.update('a', [homework(1, 'approved', '1')])
+            cache.update('b', [homework(2, 'rejected', '2')])
+            assert 'hw1.zip' in cache.answer('a', 'status'), (
+                'Вытесненный из памяти арендатор читается из хранилища.'
+            )
+        with StateStore(path) as store:
+            cache = StatusCache(store)
+            assert cache.statuses('b') == [('hw2.zip', 'rejected', '2')]
+            assert cache.answer('b', 'history') == 'История недоступна.', (
+                'Без журнала истории команда /history не падает.'
+            )
+
+    def test_store_is_written_outside_lock(self):
+        store = StateStore(':memory:')
+        cache = StatusCache(store)
+        locked = []
+        set_status = store.set_status
+
+        def checked_set_status(*args):
+            locked.append(cache.lock.locked())
+            set_status(*args)
+
+        store.set_status = checked_set_status
+        cache.update('42', [homework(1, 'approved', '1'),
+                            homework(2, 'reviewing', '2')])
+        assert locked == [False, False], (
+            'Запись на диск не должна задерживать ответы на команды.'
+        )
+        assert len(cache.statuses('42')) == 2
+
+    def test_handler_replies_to_chat(self):
+        bot = FakeBot()
+        cache = StatusCache(StateStore(':memory:'))
+        cache.update('student', [homework(1, 'approved', '1')])
+        register(bot, cache, {'42': 'student'})
+        (commands, handler), = bot.handlers
+        assert set(commands) == {'status', 'history', 'pending'}
+        handler(SimpleNamespace(chat=SimpleNamespace(id=42),
+                                text='/status@homework_bot'))
+        handler(SimpleNamespace(chat=SimpleNamespace(id=13),
+                                text='/status'))
+        assert bot.sent[0][0] == 42 and 'hw1.zip' in bot.sent[0][1]
+        assert bot.sent[1][1].startswith('Для этого чата')
+
+    def test_parse_command(self):
+        assert parse_command('/History@bot extra') == 'history'
+        assert parse_command('hello') is None
+
+    def test_poller_fills_cache(self, homework_module):
+        clock = VirtualClock(1000)
+        calls = []
+
+        def fetch(timestamp):
+            calls.append(timestamp)
+            return {'homeworks': [homework(1, 'reviewing', '1')],
+                    'current_date': 1000}
+
+        store = StateStore(':memory:')
+        cache = StatusCache(store)
+        poller = homework_module.Poller(
+            RecordingBot(clock), store, fetch, clock, chat_id='42',
+            statuses=cache)
+        poller.poll()
+        assert 'hw1.zip' in cache.answer('42', 'pending')
+        assert len(calls) == 1, 'Команды не должны обращаться к API.'
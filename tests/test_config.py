@@ -0,0 +1,150 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import httpx
+
+import engine
+import homework
+from config import FileWatcher, read_env
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def replace(path, text):
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(f'{path}.tmp', path)
+
+
+class FakeWatcher:
+
+    def __init__(self, changed):
+        self.changed = changed
+
+    def take(self):
+        changed, self.changed = self.changed, set()
+        return changed
+
+
+class TestConfig:
+
+    def test_env_file_overrides_environment(self, tmp_path, monkeypatch):
+        path = tmp_path / '.env'
+        monkeypatch.setenv('TELEGRAM_TOKEN', 'old')
+        assert read_env(str(path))['TELEGRAM_TOKEN'] == 'old'
+        path.write_text('TELEGRAM_TOKEN = new\n', encoding='utf-8')
+        assert read_env(str(path))['TELEGRAM_TOKEN'] == 'new', (
+            'Значение из перечитанного .env важнее окружения процесса.'
+        )
+
+    def test_env_file_is_loaded_before_modules(self, tmp_path):
+        (tmp_path / '.env').write_text(
+            'SYNC_OVERLAP=5\nREVIEWING_PERIOD=30\nCONNECT_TIMEOUT=2\n'
+            'BOT_COMMANDS=true\nMAX_CONCURRENCY=7\n', encoding='utf-8')
+        env = {name: value for name, value in os.environ.items()
+               if name not in ('SYNC_OVERLAP', 'REVIEWING_PERIOD',
+                               'CONNECT_TIMEOUT', 'BOT_COMMANDS',
+                               'MAX_CONCURRENCY', 'ENV_FILE')}
+        env['PYTHONPATH'] = BASE_DIR
+        code = ('import engine, changes, commands, scheduler, transport; '
+                'print(changes.SYNC_OVERLAP, scheduler.REVIEWING_PERIOD, '
+                'transport.CONNECT_TIMEOUT, commands.BOT_COMMANDS, '
+                'engine.MAX_CONCURRENCY)')
+        result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path,
+                                env=env, capture_output=True, text=True,
+                                check=True)
+        assert result.stdout.split() == ['5', '30', '2.0', 'True', '7'], (
+            'Настройки из .env должны действовать во всех модулях.'
+        )
+
+    def test_polling_detects_atomic_replace(self, tmp_path):
+        path = str(tmp_path / '.env')
+        replace(path, 'A=1\n')
+        watcher = FileWatcher([path], use_inotify=False)
+        assert watcher.check() == []
+        replace(path, 'A=2\n')
+        assert watcher.check() == [path]
+        assert watcher.take() == {path}
+        assert watcher.take() == set()
+        os.remove(path)
+        assert watcher.check() == [path], 'Удаление файла тоже изменение.'
+
+    def test_watcher_thread_calls_back(self, tmp_path):
+        path = str(tmp_path / 'tenants.json')
+        called = threading.Event()
+        watcher = FileWatcher([path], lambda paths: called.set(),
+                              interval=0.05).start()
+        try:
+            replace(path, '[]')
+            assert called.wait(1), 'Изменение файла должно быть замечено.'
+        finally:
+            watcher.stop()
+        assert not watcher.thread.is_alive()
+
+    def test_poller_applies_rotated_tokens(self, tmp_path, monkeypatch):
+        for name in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN',
+                     'TELEGRAM_CHAT_ID', 'HEADERS'):
+            monkeypatch.setattr(homework, name, getattr(homework, name))
+        path = tmp_path / '.env'
+        monkeypatch.setattr(homework, 'ENV_FILE', str(path))
+        bot = type('Bot', (), {'token': 'old'})()
+        poller = homework.Poller(bot, homework.StateStore(':memory:'),
+                                 watcher=FakeWatcher({str(path)}))
+        path.write_text('PRACTICUM_TOKEN=rotated\nTELEGRAM_TOKEN=\n',
+                        encoding='utf-8')
+        poller.reload()
+        assert homework.HEADERS['Authorization'] != 'OAuth rotated', (
+            'Настройки без токена бота не применяются.'
+        )
+        path.write_text('PRACTICUM_TOKEN=rotated\nTELEGRAM_TOKEN=1:new\n'
+                        'TELEGRAM_CHAT_ID=7\nRETRY_PERIOD=300\n',
+                        encoding='utf-8')
+        poller.watcher.changed = {str(path)}
+        poller.reload()
+        assert homework.HEADERS == {'Authorization': 'OAuth rotated'}
+        assert homework.TELEGRAM_CHAT_ID == '7'
+        assert poller.chats == {'7': poller.chat_id}, (
+            'Команды из нового чата отвечают по прежнему ключу состояния.'
+        )
+        assert bot.token == '1:new', 'Токен меняется в том же объекте бота.'
+        assert poller.scheduler.next_delay() == 300
+
+    def test_engine_applies_registry(self, data_with_new_hw_status):
+        requests = []
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                return httpx.Response(200, json={'ok': True})
+            requests.append(request.headers['Authorization'])
+            return httpx.Response(200, json=data_with_new_hw_status)
+
+        first = engine.Tenant('token-a', 1)
+        bot = engine.Engine([first, engine.Tenant('token-b', 2)],
+                            '1234:abcdefg', retry_period=0.05)
+
+        async def run():
+            async with httpx.AsyncClient(
+                    transport=httpx.MockTransport(handler)) as client:
+                runner = asyncio.create_task(bot.run(client))
+                await asyncio.sleep(0.15)
+                bot.reload([engine.Tenant('rotated', 1),
+                            engine.Tenant('token-c', 3)],
+                           {'TELEGRAM_TOKEN': '1:new'})
+                requests.clear()
+                await asyncio.sleep(0.2)
+                assert set(bot.pollers) == {'1', '3'}
+                bot.stop()
+                await runner
+
+        asyncio.run(run())
+        assert set(requests) == {'OAuth rotated', 'OAuth token-c'}, (
+            'После перечитывания реестра опрос идёт с новыми токенами.'
+        )
+        assert bot.tenants['1'] is first, (
+            'Смена токена не пересоздаёт арендатора и его цикл опроса.'
+        )
+        assert bot.telegram_token == '1:new'
+        assert '2' not in bot.states
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import decoding
+from decoding import HomeworkStream, iter_homeworks
+
+
+def split(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class TestDecoding:
+    DATA = {
+        'homeworks': [
+            {'id': number, 'homework_name': f'Работа "{number}".zip',
+             'status': 'approved', 'date_updated': '2021-04-11T10:31:09Z'}
+            for number in range(100)
+        ],
+        'current_date': 1000198000,
+    }
+
+    def test_loads_fallback(self):
+        assert decoding.get_loads('json') is json.loads
+        body = json.dumps(self.DATA).encode()
+        assert decoding.loads(body) == self.DATA
+
+    @pytest.mark.parametrize('size', [1, 3, 64, 100000])
+    def test_stream_yields_every_homework(self, size):
+        body = json.dumps(self.DATA, ensure_ascii=False).encode()
+        stream = HomeworkStream()
+        homeworks = list(iter_homeworks(split(body, size), stream))
+        assert homeworks == self.DATA['homeworks']
+        assert stream.fields == {'current_date': 1000198000}
+
+    @pytest.mark.parametrize('body, error', [
+        (b'[{"homeworks": []}]', TypeError),
+        (b'{"current_date": 123246}', KeyError),
+        (b'{"homeworks": {"status": "approved"}}', TypeError),
+        (b'{"homeworks": [{"id": 1}', ValueError),
+    ])
+    def test_stream_checks_response(self, body, error):
+        with pytest.raises(error):
+            list(iter_homeworks(split(body, 5)))
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+from delivery import DeliveryQueue, RecipientBackoff, TokenBucket
+from exceptions import CircuitOpen
+
+
+class TestDelivery:
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert 0 < bucket.reserve() <= 0.1
+        bucket.pause(5)
+        assert bucket.reserve() > 5
+
+    def test_per_chat_rate_does_not_block_other_chats(self):
+        sent = []
+
+        async def send(chat_id, text):
+            sent.append((time.monotonic(), chat_id))
+            return True
+
+        async def run():
+            queue = DeliveryQueue(workers=4, global_rate=1000, chat_rate=2)
+            queue.start(send)
+            futures = [queue.put(1, 'a') for _ in range(3)]
+            futures += [queue.put(chat_id, 'b') for chat_id in range(2, 10)]
+            started = time.monotonic()
+            results = await asyncio.gather(*futures)
+            await queue.stop()
+            return started, results
+
+        started, results = asyncio.run(run())
+        assert all(results)
+        others = [moment for moment, chat_id in sent if chat_id != 1]
+        first_chat = [moment for moment, chat_id in sent if chat_id == 1]
+        assert max(others) - started < 0.1, (
+            'Лимит одного чата не должен задерживать другие чаты.'
+        )
+        assert first_chat[-1] - first_chat[0] >= 0.4
+
+    def test_waiting_chat_does_not_hold_worker(self):
+        sent = []
+
+        async def send(chat_id, text):
+            sent.append(text)
+            return True
+
+        async def run():
+            queue = DeliveryQueue(workers=1, global_rate=1000)
+            queue.chat_buckets[1] = TokenBucket(rate=20, capacity=1)
+            queue.start(send)
+            futures = [queue.put(1, f'a{number}') for number in range(3)]
+            futures.append(queue.put(2, 'b'))
+            assert len(queue) == 4
+            await queue.join()
+            await queue.stop()
+            return await asyncio.gather(*futures)
+
+        assert all(asyncio.run(run()))
+        assert sent == ['a0', 'b', 'a1', 'a2'], (
+            'Единственный воркер не должен ждать лимита одного чата, '
+            'а порядок сообщений в чате должен сохраняться.'
+        )
+
+    def test_recipient_backoff_doubles(self):
+        now = [0]
+        backoff = RecipientBackoff(base=10, maximum=25, clock=lambda: now[0])
+        assert backoff.ready('a')
+        assert [backoff.failure('a') for _ in range(3)] == [10, 20, 25]
+        assert not backoff.ready('a') and backoff.ready('b')
+        now[0] = 25
+        assert backoff.ready('a')
+        backoff.success('a')
+        assert len(backoff) == 0
+
+    def test_recipient_is_exhausted_after_limit(self):
+        backoff = RecipientBackoff(base=10, maximum=25, clock=lambda: 0,
+                                   limit=2)
+        backoff.failure('a')
+        assert not backoff.exhausted('a')
+        backoff.failure('a')
+        assert backoff.exhausted('a')
+        backoff.give_up('b')
+        assert backoff.exhausted('b') and not backoff.ready('b')
+        backoff.success('a')
+        assert not backoff.exhausted('a'), (
+            'Удачная доставка возвращает получателя.'
+        )
+
+    def test_open_circuit_holds_message(self):
+        calls = []
+
+        async def send(chat_id, text):
+            calls.append(text)
+            if len(calls) < 3:
+                raise CircuitOpen('Telegram недоступен', 0.01)
+            return True
+
+        async def run():
+            queue = DeliveryQueue(workers=1, global_rate=1000,
+                                  max_attempts=1)
+            queue.start(send)
+            result = await queue.put(1, 'a')
+            await queue.stop()
+            return result
+
+        assert asyncio.run(run()), (
+            'Сообщение должно дождаться замыкания предохранителя, '
+            'не расходуя попытки.'
+        )
+        assert calls == ['a'] * 3
@@ -0,0 +1,387 @@
+import asyncio
+import functools
+import json
+
+import httpx
+import pytest
+
+import engine
+from changes import SYNC_OVERLAP
+from delivery import DeliveryQueue, RecipientBackoff
+from exceptions import WrongAnswer, WrongRegistry
+from history import HistoryLog
+from state import StateStore
+
+
+def make_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def make_engine(tenant):
+    return engine.Engine([tenant], '1234:abcdefg',
+                         delivery=DeliveryQueue(workers=2, chat_rate=100))
+
+
+def poll(bot, tenant, handler, times=1):
+    async def run():
+        async with make_client(handler) as client:
+            bot.delivery.start(functools.partial(bot.send_message, client))
+            for _ in range(times):
+                await bot.poll_tenant(client, tenant)
+                await bot.drain()
+            await bot.delivery.stop()
+
+    asyncio.run(run())
+
+
+class TestEngine:
+
+    def test_load_tenants(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'b', 'chat_id': 2, 'key': 'second',
+             'subscribers': [3, 2, -100]},
+        ]))
+        tenants = engine.load_tenants(path)
+        assert [tenant.key for tenant in tenants] == ['1', 'second']
+        assert tenants[0].headers == {'Authorization': 'OAuth a'}
+        assert tenants[0].recipients == (1,)
+        assert tenants[1].recipients == (2, 3, -100)
+        assert tenants[1].delivery_key(2) == 'second'
+        assert tenants[1].delivery_key(3) == 'second>3'
+
+    @pytest.mark.parametrize('content', [
+        '{}', '[{"chat_id": 1}]', '[{"practicum_token": "", "chat_id": 1}]',
+        'not json', '[{"practicum_token": "a", "chat_id": 1, '
+        '"subscribers": 2}]',
+    ])
+    def test_load_invalid_tenants(self, tmp_path, content):
+        path = tmp_path / 'tenants.json'
+        path.write_text(content)
+        with pytest.raises(WrongRegistry):
+            engine.load_tenants(path)
+
+    def test_poll_tenant_sends_status(self, data_with_new_hw_status):
+        sent = []
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                sent.append(json.loads(request.content))
+                return httpx.Response(200, json={'ok': True})
+            assert request.headers['Authorization'] == 'OAuth token'
+            assert request.url.params['from_date'] in (
+                str(1000 - SYNC_OVERLAP),
+                str(data_with_new_hw_status['current_date'] - SYNC_OVERLAP),
+            ), 'Запрос должен перекрывать окно предыдущего.'
+            return httpx.Response(200, json=data_with_new_hw_status)
+
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        bot.states['42'].timestamp = 1000
+        poll(bot, tenant, handler, times=2)
+        assert len(sent) == 1, 'Повторный статус не должен отправляться.'
+        assert sent[0]['chat_id'] == 42
+        assert 'Работа проверена' in sent[0]['text']
+        assert bot.states['42'].timestamp == data_with_new_hw_status['current_date']
+
+    def test_poll_tenant_reports_error(self):
+        sent = []
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                sent.append(json.loads(request.content)['text'])
+                return httpx.Response(200, json={'ok': True})
+            return httpx.Response(500)
+
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        poll(bot, tenant, handler)
+        assert sent and sent[0].startswith('Сбой в работе программы')
+
+    def test_alternating_errors_are_sent_once(self):
+        sent = []
+        statuses = iter([500, 502, 500, 502, 500])
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                sent.append(json.loads(request.content)['text'])
+                return httpx.Response(200, json={'ok': True})
+            return httpx.Response(next(statuses))
+
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        poll(bot, tenant, handler, times=5)
+        assert len(sent) == 2, (
+            'Чередующиеся ошибки должны отправляться по одному разу за окно.'
+        )
+
+    def test_open_circuit_skips_api_calls(self):
+        calls = []
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                return httpx.Response(200, json={'ok': True})
+            calls.append(request)
+            return httpx.Response(502)
+
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        bot.api_breaker.failure_threshold = 2
+        poll(bot, tenant, handler, times=4)
+        assert len(calls) == 2, (
+            'При разомкнутом предохранителе запросы к API не выполняются.'
+        )
+        assert bot.get_scheduler(tenant).next_delay() >= 59, (
+            'Следующий опрос должен ждать пробного вызова.'
+        )
+
+    def test_poll_tenant_sends_every_change(self, data_with_new_hw_status,
+                                            tmp_path):
+        sent = []
+        data = dict(data_with_new_hw_status)
+        data['homeworks'] = [
+            dict(data['homeworks'][0], id=2, status='reviewing'),
+            data['homeworks'][0],
+        ]
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                sent.append(json.loads(request.content)['text'])
+                return httpx.Response(200, json={'ok': True})
+            return httpx.Response(200, json=data)
+
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        bot.history = HistoryLog(str(tmp_path))
+        poll(bot, tenant, handler, times=2)
+        assert len(sent) == 2, 'Ожидается по сообщению на каждую работу.'
+        assert sent[1].endswith('Работа взята на проверку ревьюером.')
+        assert [record['homework'] for record in bot.history.query('42')] == [
+            str(data['homeworks'][1]['id']), '2'], (
+            'Доставленные смены статусов попадают в журнал истории.'
+        )
+
+    def test_fan_out_keeps_state_per_recipient(self,
+                                               data_with_new_hw_status):
+        sent = []
+
+        async def handler(request):
+            if request.url.host != 'api.telegram.org':
+                return httpx.Response(200, json=data_with_new_hw_status)
+            chat_id = json.loads(request.content)['chat_id']
+            sent.append(chat_id)
+            if chat_id == 100:
+                await asyncio.sleep(0.2)
+            if chat_id == 200:
+                return httpx.Response(403, json={
+                    'ok': False, 'description': 'bot was blocked by the user'})
+            return httpx.Response(200, json={'ok': True})
+
+        tenant = engine.Tenant('token', 42, subscribers=[100, 200])
+        bot = engine.Engine([tenant], '1234:abcdefg',
+                            store=StateStore(':memory:'),
+                            delivery=DeliveryQueue(workers=4, chat_rate=100))
+        poll(bot, tenant, handler, times=2)
+        assert sorted(sent) == [42, 100, 200], (
+            'Сообщение уходит каждому получателю один раз; заблокированный '
+            'чат на паузе не получает попыток в следующем цикле.'
+        )
+        assert not bot.backoff.ready('42>200')
+        assert bot.backoff.ready('42') and bot.backoff.ready('42>100')
+        homework_id = data_with_new_hw_status['homeworks'][0]['id']
+        assert bot.store.get_message('42>100', homework_id), (
+            'Доставка медленному получателю учитывается отдельно.'
+        )
+        assert bot.store.get_message('42>200', homework_id) is None
+
+    def test_dead_subscriber_does_not_pin_tenant(self,
+                                                 data_with_new_hw_status):
+        def handler(request):
+            if request.url.host != 'api.telegram.org':
+                return httpx.Response(200, json=data_with_new_hw_status)
+            if json.loads(request.content)['chat_id'] == 200:
+                return httpx.Response(403, json={
+                    'ok': False, 'description': 'bot was kicked'})
+            return httpx.Response(200, json={'ok': True})
+
+        tenant = engine.Tenant('token', 42, subscribers=[200])
+        bot = make_engine(tenant)
+        bot.backoff = RecipientBackoff(limit=1)
+        poll(bot, tenant, handler)
+        assert bot.backoff.exhausted('42>200')
+        assert bot.states['42'].timestamp == (
+            data_with_new_hw_status['current_date']), (
+            'Недоступный подписчик не держит from_date арендатора.'
+        )
+        assert len(bot.get_snapshot(tenant)) == 1
+        assert '42' in bot.cache.entries, 'Кэш ответа арендатора сохраняется.'
+
+    def test_unknown_status_queues_nothing(self):
+        good = {'id': 1, 'homework_name': 'hw1.zip', 'status': 'approved',
+                'date_updated': '2021-04-11T10:31:09Z'}
+        bad = dict(good, id=2, homework_name='hw2.zip', status='unknown')
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+
+        async def run():
+            with pytest.raises(ValueError):
+                bot.deliver_changes(tenant, [bad, good], 1000)
+            assert len(bot.delivery) == 0, (
+                'Ошибка разбора не должна оставлять в очереди часть событий.'
+            )
+            assert len(bot.get_snapshot(tenant)) == 0
+            bot.deliver_changes(tenant, [good], 1000)
+            assert len(bot.delivery) == 1, (
+                'Исправная работа доставляется в следующем цикле.'
+            )
+
+        asyncio.run(run())
+
+    def test_telegram_flood_wait_is_retried(self, data_with_new_hw_status):
+        answers = [
+            httpx.Response(429, json={'ok': False,
+                                      'parameters': {'retry_after': 0.01}}),
+            httpx.Response(200, json={'ok': True}),
+        ]
+        sent = []
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                sent.append(request)
+                return answers.pop(0)
+            return httpx.Response(200, json=data_with_new_hw_status)
+
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        poll(bot, tenant, handler)
+        assert len(sent) == 2, 'После 429 сообщение нужно отправить снова.'
+        assert bot.states['42'].timestamp == data_with_new_hw_status['current_date']
+
+    def test_unchanged_answer_is_not_processed(
+            self, monkeypatch, data_with_new_hw_status):
+        calls = []
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                return httpx.Response(200, json={'ok': True})
+            return httpx.Response(200, json=data_with_new_hw_status)
+
+        def mock_check_response(response):
+            calls.append(response)
+            return response['homeworks']
+
+        monkeypatch.setattr(engine, 'check_response', mock_check_response)
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        poll(bot, tenant, handler, times=3)
+        assert len(calls) == 1, 'Неизменный ответ не должен разбираться.'
+        assert bot.cache.hits == 2
+
+    def test_cancelled_error_message_is_forgotten(self):
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        error = WrongAnswer('Ошибка: Статус не ОК 502:')
+
+        async def run():
+            bot.notify_error(tenant, error)
+            _, _, future, _ = bot.delivery.queue.get_nowait()
+            future.cancel()
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        assert bot.errors.report(error, 'текст', tenant.key) == 'текст', (
+            'Неотправленное при остановке сообщение об ошибке забывается.'
+        )
+
+    def test_backfill_primes_snapshot(self):
+        data = {
+            'homeworks': [
+                {'id': number, 'homework_name': f'hw{number}.zip',
+                 'status': 'approved', 'date_updated': str(number)}
+                for number in range(1000)
+            ],
+            'current_date': 1000198000,
+        }
+        sent = []
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                sent.append(request)
+                return httpx.Response(200, json={'ok': True})
+            assert request.url.params['from_date'] == '0'
+            return httpx.Response(200, json=data)
+
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+
+        async def run():
+            async with make_client(handler) as client:
+                return await bot.backfill(client, tenant)
+
+        assert asyncio.run(run()) == 1000
+        assert len(bot.states['42'].snapshot) == 1000
+        assert bot.states['42'].timestamp == 1000198000
+        assert not sent, 'История не должна рассылаться.'
+
+    def test_backfill_flushes_state_in_batches(self):
+        data = {
+            'homeworks': [
+                {'id': number, 'homework_name': f'hw{number}.zip',
+                 'status': 'approved', 'date_updated': str(number)}
+                for number in range(1000)
+            ],
+            'current_date': 1000198000,
+        }
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+        bot.store = StateStore(':memory:', flush_size=50,
+                               flush_interval=3600, autoflush=False)
+        peak = []
+        set_message = bot.store.set_message
+
+        def tracked(*args):
+            set_message(*args)
+            peak.append(len(bot.store.pending['messages']))
+
+        bot.store.set_message = tracked
+
+        async def run():
+            async with make_client(
+                    lambda request: httpx.Response(200, json=data)) as client:
+                return await bot.backfill(client, tenant)
+
+        assert asyncio.run(run()) == 1000
+        assert max(peak) <= 50, (
+            'Загрузка истории не должна копить сообщения в памяти.'
+        )
+        assert bot.store.get_message('42', 999) == (
+            'Изменился статус проверки работы "hw999.zip". '
+            'Работа проверена: ревьюеру всё понравилось. Ура!')
+        bot.store.close()
+
+    def test_backfill_skips_unknown_status(self):
+        data = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1.zip', 'status': 'approved',
+                 'date_updated': '1'},
+                {'id': 2, 'homework_name': 'hw2.zip', 'status': 'unknown',
+                 'date_updated': '2'},
+                {'id': 3, 'homework_name': 'hw3.zip', 'status': 'approved',
+                 'date_updated': '3'},
+            ],
+            'current_date': 1000198000,
+        }
+        tenant = engine.Tenant('token', 42)
+        bot = make_engine(tenant)
+
+        async def run():
+            async with make_client(
+                    lambda request: httpx.Response(200, json=data)) as client:
+                return await bot.backfill(client, tenant)
+
+        assert asyncio.run(run()) == 2, (
+            'Работа с неизвестным статусом пропускается, загрузка идёт дальше.'
+        )
+        assert len(bot.states['42'].snapshot) == 2
+        assert bot.states['42'].timestamp == 1000198000
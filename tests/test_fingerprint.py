@@ -0,0 +1,30 @@
+import httpx
+
+from fingerprint import ResponseCache, fingerprint
+
+
+class TestResponseCache:
+
+    def test_current_date_is_ignored(self):
+        assert fingerprint(b'{"homeworks": [], "current_date": 1}') == (
+            fingerprint(b'{"homeworks": [], "current_date": 2}')
+        )
+        assert fingerprint(b'{"homeworks": []}') != (
+            fingerprint(b'{"homeworks": [{}]}')
+        )
+
+    def test_hits_and_conditional_headers(self):
+        cache = ResponseCache()
+        first = httpx.Response(200, content=b'{"homeworks": []}',
+                               headers={'ETag': '"v1"'})
+        assert not cache.unchanged('a', first)
+        assert cache.headers('a') == {}
+        cache.remember('a', first)
+        assert cache.headers('a') == {'If-None-Match': '"v1"'}
+        assert cache.unchanged('a', httpx.Response(304))
+        assert cache.unchanged(
+            'a', httpx.Response(200, content=b'{"homeworks": []}'))
+        cache.forget('a')
+        assert not cache.unchanged('a', first)
+        assert cache.stats() == {'hits': 2, 'misses': 2, 'not_modified': 1,
+                                 'hit_rate': 0.5}
@@ -0,0 +1,140 @@
+import os
+import threading
+
+from changes import Snapshot
+from history import (
+    HistoryLog, HistoryReader, Segment, key_hash, search_index
+)
+from state import StateStore
+
+
+def homework(id, status, date_updated='2021-04-10T10:31:09Z'):
+    return {'id': id, 'homework_name': f'hw{id}.zip', 'status': status,
+            'date_updated': date_updated, 'reviewer_comment': 'ok'}
+
+
+def statuses(records):
+    return [(record['homework'], record['status']) for record in records]
+
+
+class TestHistoryLog:
+
+    def test_query_by_tenant_and_homework(self, tmp_path):
+        with HistoryLog(str(tmp_path)) as log:
+            log.append('a', homework(1, 'reviewing'))
+            log.append('b', homework(1, 'reviewing'))
+            log.append('a', homework(2, 'reviewing'))
+            log.append('a', homework(1, 'approved'))
+            assert statuses(log.query('a')) == [
+                ('1', 'reviewing'), ('2', 'reviewing'), ('1', 'approved')]
+            assert statuses(log.query('a', 1)) == [
+                ('1', 'reviewing'), ('1', 'approved')]
+            assert statuses(log.query('a', limit=1)) == [('1', 'approved')]
+            record = log.query('b')[0]
+            assert record['reviewer_comment'] == 'ok'
+            assert record['date_updated'] == '2021-04-10T10:31:09Z'
+
+    def test_sealed_segments_are_searched_by_index(self, tmp_path):
+        with HistoryLog(str(tmp_path), segment_size=200) as log:
+            for number in range(20):
+                log.append(f'tenant-{number % 4}',
+                           homework(number, 'approved'))
+            assert len(log.segments) > 5, 'Журнал должен делиться на сегменты.'
+        with HistoryLog(str(tmp_path), segment_size=200) as log:
+            sealed = log.segments[0]
+            assert sealed.sealed
+            offsets = search_index(sealed.index_path('tenant'),
+                                   key_hash('tenant-0'))
+            assert offsets == [0], 'Индекс указывает смещение записи.'
+            records = log.query('tenant-1')
+            assert [record['homework'] for record in records] == [
+                '1', '5', '9', '13', '17']
+            assert statuses(log.query('tenant-2', 10)) == [('10', 'approved')]
+
+    def test_rotation_does_not_wait_for_sealing(self, tmp_path,
+                                                monkeypatch):
+        release = threading.Event()
+        seal = Segment.seal
+
+        def slow_seal(segment, records=None):
+            release.wait(5)
+            seal(segment, records)
+
+        monkeypatch.setattr(Segment, 'seal', slow_seal)
+        with HistoryLog(str(tmp_path), segment_size=200) as log:
+            for number in range(6):
+                log.append('a', homework(number, 'approved'))
+            assert len(log.segments) > 1
+            assert not log.segments[0].sealed, (
+                'Индексы строятся вне append.'
+            )
+            assert len(log.query('a')) == 6, (
+                'Незакрытый сегмент ищется по индексу в памяти.'
+            )
+            release.set()
+            log.sealer.join()
+            assert log.segments[0].sealed
+            assert len(log.query('a')) == 6
+
+    def test_torn_record_is_dropped(self, tmp_path):
+        with HistoryLog(str(tmp_path)) as log:
+            log.append('a', homework(1, 'reviewing'))
+            path = log.active.path
+        with open(path, 'ab') as file:
+            file.write(b'{"tenant": "a", "home')
+        with HistoryLog(str(tmp_path)) as log:
+            log.append('a', homework(1, 'approved'))
+            assert statuses(log.query('a')) == [
+                ('1', 'reviewing'), ('1', 'approved')], (
+                'Неполная запись после сбоя отбрасывается.'
+            )
+
+    def test_compaction_merges_and_deduplicates(self, tmp_path):
+        with HistoryLog(str(tmp_path), segment_size=150,
+                        compact_after=2) as log:
+            for _ in range(2):
+                for number in range(5):
+                    log.append('a', homework(number, 'approved'))
+            before = len(log.segments)
+            assert log.compact() == before - 1
+            assert len(log.segments) == 2
+            records = log.query('a')
+            assert len(records) == 5 + len(log.active.scan()), (
+                'Повторы из закрытых сегментов должны слиться в одну запись.'
+            )
+            assert set(statuses(records)) == {
+                (str(number), 'approved') for number in range(5)}
+        names = os.listdir(tmp_path)
+        assert not [name for name in names if '.compact' in name]
+        with HistoryLog(str(tmp_path), segment_size=150) as log:
+            assert log.segments[0].sealed, 'Слитый сегмент закрыт индексом.'
+
+    def test_reader_sees_writer_records(self, tmp_path):
+        reader = HistoryReader(str(tmp_path / 'missing'))
+        assert reader.query('a') == []
+        with HistoryLog(str(tmp_path), segment_size=200) as log:
+            reader = HistoryReader(str(tmp_path))
+            for number in range(6):
+                log.append('a', homework(number, 'reviewing'))
+            assert len(reader.query('a')) == 6
+            log.append('a', homework(0, 'approved'))
+            assert statuses(reader.query('a', 0, limit=1)) == [
+                ('0', 'approved')]
+
+    def test_restart_does_not_duplicate_records(self, tmp_path,
+                                                homework_module):
+        sent = []
+        bot = type('Bot', (), {
+            'send_message': lambda self, chat_id, text: sent.append(text)})()
+        work = homework(1, 'reviewing')
+        with StateStore(':memory:') as store, \
+                HistoryLog(str(tmp_path)) as log:
+            homework_module.deliver_changes(bot, Snapshot(), store, [work],
+                                            'a', log)
+            failed = homework_module.deliver_changes(
+                bot, Snapshot(), store, [work], 'a', log)
+            assert failed == []
+            assert len(sent) == 1
+            assert len(log.query('a')) == 1, (
+                'Доставленная до перезапуска смена не пишется повторно.'
+            )
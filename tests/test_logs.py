@@ -0,0 +1,54 @@
+import json
+import logging
+
+import logs
+
+
+def make_record(message, level=logging.DEBUG, tenant=None):
+    record = logging.LogRecord('root', level, __file__, 1, message, None,
+                               None)
+    if tenant is not None:
+        record.tenant = tenant
+    return record
+
+
+class TestLogs:
+
+    def test_sampling_per_tenant(self):
+        sampler = logs.SamplingFilter(every=10)
+        passed = [sampler.filter(make_record('Нет изменений', tenant='a'))
+                  for _ in range(25)]
+        assert passed.count(True) == 3
+        assert sampler.filter(make_record('Нет изменений', tenant='b')), (
+            'Прореживание должно вестись отдельно по арендаторам.'
+        )
+        assert all(sampler.filter(make_record('Сбой', logging.ERROR))
+                   for _ in range(5)), 'Ошибки нельзя прореживать.'
+
+    def test_json_formatter(self):
+        line = logs.JsonFormatter().format(
+            make_record('Изменился статус', logging.INFO, tenant='12345'))
+        data = json.loads(line)
+        assert data['message'] == 'Изменился статус'
+        assert data['tenant'] == '12345'
+        assert data['level'] == 'INFO'
+
+    def test_queue_handler_writes_rotating_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(logs, 'LOG_MAX_BYTES', 200)
+        path = tmp_path / 'bot.log'
+        handler = logs.queue_handler(str(path), log_format='json',
+                                     sample_every=1)
+        logger = logging.getLogger('test_logs')
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            for number in range(20):
+                logger.warning(f'Сообщение {number}')
+        finally:
+            logger.removeHandler(handler)
+            logs.stop_listener(handler.listener)
+        files = sorted(tmp_path.iterdir())
+        assert len(files) > 1, 'Файл лога должен ротироваться по размеру.'
+        assert len(files) <= logs.LOG_BACKUP_COUNT + 1
+        last = path.read_text(encoding='utf-8').splitlines()[-1]
+        assert json.loads(last)['message'] == 'Сообщение 19'
@@ -0,0 +1,54 @@
+import json
+import urllib.request
+
+import pytest
+
+from metrics import Registry, start_exporter
+
+
+class TestMetrics:
+
+    def test_histogram_quantiles(self):
+        histogram = Registry().histogram('latency', 'Время', (0.1, 0.2, 1))
+        for _ in range(98):
+            histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(0.9)
+        assert histogram.quantile(0.5) == pytest.approx(0.051, rel=0.01)
+        assert 0.2 < histogram.quantile(0.99) <= 1
+        assert histogram.count == 100
+
+    def test_counter_by_cause(self):
+        counter = Registry().counter('errors', 'Ошибки')
+        counter.inc('status_502')
+        counter.inc('status_502')
+        counter.inc('request_error')
+        assert dict(counter.samples()) == {
+            'errors{cause="request_error"}': 1,
+            'errors{cause="status_502"}': 2,
+        }
+
+    def test_exporter(self):
+        registry = Registry()
+        registry.gauge('queue', 'Очередь').set_function(lambda: 7)
+        with registry.histogram('poll', 'Опрос').time():
+            pass
+        server = start_exporter(0, registry=registry)
+        try:
+            url = f'http://127.0.0.1:{server.server_port}'
+            with urllib.request.urlopen(f'{url}/metrics') as response:
+                text = response.read().decode()
+            with urllib.request.urlopen(f'{url}/metrics.json') as response:
+                data = json.load(response)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert '# TYPE poll histogram' in text
+        assert 'poll_p99' not in text, (
+            'В блоке histogram допустимы только корзины, сумма и количество.'
+        )
+        assert '# TYPE poll_quantile gauge' in text
+        assert 'poll_quantile{quantile="0.99"}' in text
+        assert 'queue 7' in text
+        assert data['poll_count'] == 1
+        assert 'poll_p99' in data
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import engine
+from exceptions import WrongToken
+from probe import probe
+
+
+def make_handler(bad_tokens=(), bad_chats=(), bot_status=200, delay=0,
+                 hang=()):
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(delay)
+        if request.url.host == 'api.telegram.org':
+            if request.url.path.endswith('/getMe'):
+                return httpx.Response(bot_status, json={'ok': True})
+            if request.url.params['chat_id'] in bad_chats:
+                return httpx.Response(400, json={
+                    'ok': False, 'description': 'Bad Request: chat not found'})
+            return httpx.Response(200, json={'ok': True})
+        token = request.headers['Authorization'].split()[-1]
+        if token in hang:
+            await asyncio.sleep(10)
+        if token in bad_tokens:
+            return httpx.Response(401, json={'message': 'Unauthorized'})
+        return httpx.Response(200, json={'homeworks': [], 'current_date': 1})
+
+    handler.requests = requests
+    return handler
+
+
+def run_probe(handler, tenants, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)) as client:
+            return await probe(client, '1234:abcdefg', tenants, **kwargs)
+
+    return asyncio.run(run())
+
+
+class TestProbe:
+
+    def test_rejected_tenants_are_quarantined(self):
+        tenants = [engine.Tenant('good', 1), engine.Tenant('revoked', 2),
+                   engine.Tenant('good', 3), engine.Tenant('slow', 4)]
+        handler = make_handler(bad_tokens={'revoked'}, bad_chats={'3'},
+                               hang={'slow'})
+        report = run_probe(handler, tenants, concurrency=10, timeout=0.2)
+        assert [tenant.key for tenant in report.healthy] == ['1', '4']
+        assert set(report.quarantined) == {'2', '3'}
+        assert 'Практикум: статус 401' in report.quarantined['2']
+        assert 'chat not found' in report.quarantined['3']
+        assert '4' in report.unverified, (
+            'Не ответивший вовремя арендатор не попадает на карантин.'
+        )
+
+    def test_subscriber_chats_are_probed(self):
+        tenants = [engine.Tenant('good', 1, subscribers=[5, 6]),
+                   engine.Tenant('good', 2, subscribers=[5])]
+        handler = make_handler(bad_chats={'5'})
+        report = run_probe(handler, tenants, concurrency=10)
+        assert len(handler.requests) == 1 + 4 + 2, (
+            'Чаты подписчиков проверяются по разу на чат.'
+        )
+        assert [tenant.key for tenant in report.healthy] == ['1', '2'], (
+            'Отклонённый чат подписчика не отправляет арендатора на карантин.'
+        )
+        assert set(report.rejected_subscribers) == {'1>5', '2>5'}
+
+    def test_rejected_bot_token_stops_start(self):
+        handler = make_handler(bot_status=401)
+        with pytest.raises(WrongToken):
+            run_probe(handler, [engine.Tenant('good', 1)], concurrency=10)
+
+    def test_probe_is_parallel(self):
+        tenants = [engine.Tenant(f'token-{number}', number % 10)
+                   for number in range(200)]
+        handler = make_handler(delay=0.05)
+        started = time.perf_counter()
+        report = run_probe(handler, tenants, concurrency=100)
+        elapsed = time.perf_counter() - started
+        assert len(report.healthy) == 200
+        assert len(handler.requests) == 1 + 10 + 200, (
+            'Каждый чат проверяется один раз.'
+        )
+        assert elapsed < 1, (
+            f'Проверка 200 арендаторов заняла {elapsed:.2f} с: запросы '
+            f'должны идти параллельно.'
+        )
+
+    def test_engine_skips_quarantined_tenant(self):
+        handler = make_handler(bad_tokens={'revoked'})
+        bot = engine.Engine([engine.Tenant('good', 1),
+                             engine.Tenant('revoked', 2)],
+                            '1234:abcdefg', retry_period=0.05, probe=True)
+
+        async def run():
+            async with httpx.AsyncClient(
+                    transport=httpx.MockTransport(handler)) as client:
+                runner = asyncio.create_task(bot.run(client))
+                await asyncio.sleep(0.15)
+                assert set(bot.pollers) == {'1'}
+                bot.reload([engine.Tenant('good', 1),
+                            engine.Tenant('revoked', 2)])
+                assert '2' in bot.quarantined, (
+                    'Без смены токена арендатор остаётся на карантине.'
+                )
+                bot.reload([engine.Tenant('good', 1),
+                            engine.Tenant('fixed', 2)])
+                await asyncio.sleep(0.15)
+                assert set(bot.pollers) == {'1', '2'}
+                bot.stop()
+                await runner
+
+        asyncio.run(run())
+        assert not bot.quarantined
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+from exceptions import RetryLater
+from replay import (
+    Recorder, RecordingBot, VirtualClock, load_records, replay
+)
+from scheduler import REVIEWING_PERIOD
+from state import StateStore
+
+DAY = 24 * 60 * 60
+
+
+def homework(status, date_updated):
+    return {'id': 1, 'homework_name': 'hw.zip', 'status': status,
+            'date_updated': date_updated}
+
+
+def make_records(start=1600000000, days=2, step=600):
+    """Двое суток трафика: работа взята на проверку, затем серия
+    ошибок 502, затем работа принята. Как и API, ответ содержит работу
+    только в первые полчаса после её обновления.
+    """
+    records = []
+    for moment in range(start, start + days * DAY, step):
+        hours = (moment - start) / 3600
+        if 10 <= hours < 11:
+            records.append({'t': moment, 'from_date': moment,
+                            'error': 'WrongAnswer',
+                            'message': 'Ошибка: Статус не ОК 502:'})
+            continue
+        homeworks = []
+        if 1 <= hours < 1.5:
+            homeworks = [homework('reviewing', '2020-09-13T13:26:40Z')]
+        elif 30 <= hours < 30.5:
+            homeworks = [homework('approved', '2020-09-14T18:26:40Z')]
+        records.append({'t': moment, 'from_date': moment,
+                        'response': {'homeworks': homeworks,
+                                     'current_date': moment}})
+    return records
+
+
+class TestReplay:
+
+    @pytest.mark.parametrize('name', ['traffic.jsonl', 'traffic.jsonl.gz'])
+    def test_recorder_round_trip(self, tmp_path, name):
+        clock = VirtualClock(100)
+        answers = iter([{'homeworks': [], 'current_date': 100},
+                        RetryLater('Ошибка: Статус не ОК 429:', 30)])
+
+        def fetch(timestamp):
+            answer = next(answers)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        recorder = Recorder(tmp_path / name, fetch, clock)
+        assert recorder(50) == {'homeworks': [], 'current_date': 100}
+        clock.sleep(600)
+        with pytest.raises(RetryLater):
+            recorder(100)
+        recorder.close()
+        assert load_records(tmp_path / name) == [
+            {'t': 100, 'from_date': 50,
+             'response': {'homeworks': [], 'current_date': 100}},
+            {'t': 700, 'from_date': 100, 'error': 'RetryLater',
+             'message': 'Ошибка: Статус не ОК 429:', 'retry_after': 30},
+        ]
+
+    def test_replay_days_of_traffic(self):
+        result = replay(make_records(), messages=True)
+        texts = [message['text'] for message in result['sent']]
+        statuses = [text for text in texts if text.startswith('Изменился')]
+        assert len(statuses) == 2, 'Каждый переход сообщается один раз.'
+        assert 'на проверку' in statuses[0]
+        assert 'Ура!' in statuses[1]
+        errors = [text for text in texts if '502' in text]
+        assert errors and len(errors) <= 2, (
+            'Серия одинаковых ошибок не должна сообщаться каждый цикл.'
+        )
+        assert result['cycles'] > 29 * 3600 / REVIEWING_PERIOD, (
+            'Пока работа на проверке, опрос идёт чаще.'
+        )
+        assert result['virtual_seconds'] >= 2 * DAY - 600
+        assert result['speedup'] >= 1000, (
+            'Воспроизведение должно идти быстрее реального времени в 1000 раз.'
+        )
+
+    def test_replay_restores_errors(self):
+        records = [{'t': 0, 'from_date': 0, 'error': 'Unknown',
+                    'message': 'boom'}]
+        result = replay(records, messages=True)
+        assert result['cycles'] == 1
+        assert result['sent'][0]['text'] == 'Сбой в работе программы: boom'
+
+    def test_reviewing_outlives_from_date_window(self, homework_module):
+        start = 1600000000
+        clock = VirtualClock(start)
+        server = [{'id': 1, 'homework_name': 'hw.zip', 'status': 'reviewing',
+                   'updated': start + 60}]
+
+        def fetch(from_date):
+            homeworks = [
+                {**work, 'date_updated': time.strftime(
+                    '%Y-%m-%dT%H:%M:%SZ', time.gmtime(work['updated']))}
+                for work in server if work['updated'] >= from_date
+            ]
+            return {'homeworks': homeworks, 'current_date': int(clock.time())}
+
+        with StateStore(':memory:') as store:
+            poller = homework_module.Poller(RecordingBot(clock), store,
+                                            fetch=fetch, clock=clock)
+            delays = []
+            while clock.time() < start + 3600:
+                delays.append(poller.poll())
+                clock.sleep(delays[-1])
+            server[0].update(status='approved', updated=int(clock.time()))
+            clock.sleep(poller.poll())
+            final = poller.poll()
+        assert set(delays) == {REVIEWING_PERIOD}, (
+            'Работа на проверке пропадает из ответов с from_date, '
+            'но опрос должен оставаться частым до конца проверки.'
+        )
+        assert final == homework_module.RETRY_PERIOD
@@ -0,0 +1,74 @@
+from email.utils import formatdate
+
+import pytest
+
+from exceptions import CircuitOpen, RetryLater, WrongAnswer
+from scheduler import Scheduler, parse_retry_after
+
+
+class TestScheduler:
+
+    def test_steady_period(self):
+        scheduler = Scheduler(600)
+        scheduler.success(False)
+        assert scheduler.next_delay() == 600
+
+    def test_reviewing_shortens_period(self):
+        scheduler = Scheduler(600, reviewing_period=120)
+        scheduler.success(True)
+        assert scheduler.next_delay() == 120
+
+    def test_set_period_keeps_configured_limits(self):
+        scheduler = Scheduler(600, reviewing_period=60, max_backoff=1200,
+                              jitter=0)
+        scheduler.set_period(300)
+        scheduler.success(True)
+        assert scheduler.next_delay() == 60, (
+            'Смена периода не сбрасывает заданный период проверки.'
+        )
+        assert scheduler.max_backoff == 1200
+        scheduler.set_period(30)
+        assert scheduler.next_delay() == 30
+
+    def test_backoff_grows_with_jitter(self):
+        scheduler = Scheduler(600, max_backoff=3600, jitter=0.2)
+        delays = []
+        for _ in range(5):
+            scheduler.failure(WrongAnswer('502'))
+            delays.append(scheduler.next_delay())
+        assert 480 <= delays[0] <= 720
+        assert 960 <= delays[1] <= 1440
+        assert delays[-1] <= 3600 * 1.2, 'Пауза ограничена max_backoff.'
+        scheduler.success()
+        assert scheduler.next_delay() == 600
+
+    def test_retry_after_is_honoured(self):
+        scheduler = Scheduler(600, jitter=0)
+        scheduler.failure(RetryLater('429', retry_after=5000))
+        assert scheduler.next_delay() == 5000
+
+    def test_skipped_poll_does_not_grow_backoff(self):
+        scheduler = Scheduler(600, jitter=0)
+        scheduler.failure(WrongAnswer('502'))
+        for _ in range(3):
+            scheduler.postpone(CircuitOpen('открыт', retry_after=30))
+        assert scheduler.failures == 1
+        assert scheduler.next_delay() == 600, (
+            'Пропущенный опрос не удваивает паузу.'
+        )
+        scheduler.success()
+        scheduler.postpone(CircuitOpen('открыт', retry_after=900))
+        assert scheduler.next_delay() == 900
+
+    @pytest.mark.parametrize('value, expected', [
+        ('120', 120), (None, None), ('garbage', None),
+        (formatdate(1000 + 300, usegmt=True), 300),
+    ])
+    def test_parse_retry_after(self, value, expected):
+        assert parse_retry_after(value, now=1000) == expected
+
+    def test_phase_is_stable_and_spread(self):
+        phases = {Scheduler.phase(key, 600) for key in range(100)}
+        assert Scheduler.phase(1, 600) == Scheduler.phase(1, 600)
+        assert all(0 <= phase < 600 for phase in phases)
+        assert len(phases) > 50, 'Фазы арендаторов должны различаться.'
@@ -0,0 +1,56 @@
+import pytest
+
+from engine import Tenant
+from sharding import HashRing, shard_tenants, worker_index
+
+
+def make_tenants(count):
+    return [Tenant(f'token-{i}', 1000 + i) for i in range(count)]
+
+
+class TestSharding:
+
+    def test_shards_cover_registry_once(self):
+        tenants = make_tenants(1000)
+        shards = [shard_tenants(tenants, index, 4) for index in range(4)]
+        keys = [tenant.key for shard in shards for tenant in shard]
+        assert sorted(keys) == sorted(tenant.key for tenant in tenants), (
+            'Каждый арендатор должен попасть ровно в один шард.'
+        )
+        for shard in shards:
+            assert 150 <= len(shard) <= 350, (
+                'Арендаторы должны распределяться примерно поровну.'
+            )
+
+    def test_rebalance_moves_few_tenants(self):
+        keys = [str(i) for i in range(2000)]
+        before = HashRing(4)
+        after = HashRing(5)
+        moved = [key for key in keys if before.owner(key) != after.owner(key)]
+        assert len(moved) < len(keys) * 0.3, (
+            'При добавлении воркера должна переезжать примерно 1/N часть.'
+        )
+        assert all(after.owner(key) == 4 for key in moved), (
+            'Арендаторы должны переезжать только на новый воркер.'
+        )
+
+    def test_single_worker_keeps_everything(self):
+        tenants = make_tenants(10)
+        assert shard_tenants(tenants, 0, 1) == tenants
+
+    def test_index_out_of_range(self):
+        with pytest.raises(ValueError):
+            shard_tenants(make_tenants(1), 3, 3)
+
+    @pytest.mark.parametrize('env, expected', [
+        ({'WORKER_INDEX': '2'}, 2),
+        ({'DYNO': 'engine.3'}, 2),
+        ({'DYNO': 'run.local'}, 0),
+        ({}, 0),
+    ])
+    def test_worker_index(self, monkeypatch, env, expected):
+        monkeypatch.delenv('WORKER_INDEX', raising=False)
+        monkeypatch.delenv('DYNO', raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        assert worker_index() == expected
@@ -0,0 +1,85 @@
+import asyncio
+import inspect
+import os
+import signal
+import time
+
+import httpx
+import pytest
+import requests
+import telebot
+
+import engine
+import tests.check_utils as check_utils
+from delivery import DeliveryQueue
+from exceptions import Shutdown
+from shutdown import GracefulShutdown
+
+old_sleep = time.sleep
+
+
+class TestShutdown:
+
+    def test_signal_interrupts_wait(self):
+        shutdown = GracefulShutdown()
+        shutdown.install()
+        started = time.monotonic()
+        try:
+            with pytest.raises(Shutdown):
+                with shutdown.interruptible():
+                    os.kill(os.getpid(), signal.SIGTERM)
+                    old_sleep(5)
+        finally:
+            shutdown.restore()
+        assert time.monotonic() - started < 1
+
+    def test_signal_during_work_waits_for_cycle(self):
+        shutdown = GracefulShutdown()
+        shutdown.install()
+        try:
+            os.kill(os.getpid(), signal.SIGTERM)
+            assert shutdown.requested
+            with pytest.raises(Shutdown):
+                with shutdown.interruptible():
+                    pass
+        finally:
+            shutdown.restore()
+        assert signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
+
+    def test_main_stops_on_sigterm(self, monkeypatch, homework_module,
+                                   random_timestamp):
+        def sleep_with_sigterm(seconds):
+            os.kill(os.getpid(), signal.SIGTERM)
+            old_sleep(5)
+
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            check_utils.MockResponseGET(random_timestamp=random_timestamp)
+        ))
+        monkeypatch.setattr(telebot, 'TeleBot', check_utils.MockTelegramBot)
+        monkeypatch.setattr(time, 'sleep', sleep_with_sigterm)
+        inspect.unwrap(homework_module.main)()
+
+    def test_engine_drains_queue_on_stop(self, data_with_new_hw_status):
+        sent = []
+
+        def handler(request):
+            if request.url.host == 'api.telegram.org':
+                sent.append(request)
+                return httpx.Response(200, json={'ok': True})
+            return httpx.Response(200, json=data_with_new_hw_status)
+
+        tenant = engine.Tenant('token', 42)
+        bot = engine.Engine([tenant], '1234:abcdefg', retry_period=0.05,
+                            delivery=DeliveryQueue(workers=1, chat_rate=100))
+
+        async def run():
+            async with httpx.AsyncClient(
+                    transport=httpx.MockTransport(handler)) as client:
+                runner = asyncio.create_task(bot.run(client))
+                await asyncio.sleep(0.3)
+                bot.stop()
+                await asyncio.wait_for(runner, 1)
+
+        asyncio.run(run())
+        assert len(sent) == 1
+        assert not bot.delivery.tasks
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 150))
+HEAVY_MODULES = ('telebot', 'telegram', 'requests', 'httpx')
+
+
+def import_homework(code=''):
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import homework{code}'],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True,
+    )
+
+
+def cumulative_ms(importtime_log, module):
+    for line in importtime_log.splitlines():
+        if line.startswith('import time:') and line.endswith(f'| {module}'):
+            return int(line.split('|')[1]) / 1000
+    raise AssertionError(f'Модуль {module} не найден в выводе importtime')
+
+
+class TestStartup:
+
+    @pytest.mark.timeout(10)
+    def test_import_time_budget(self):
+        import_homework()
+        spent = min(cumulative_ms(import_homework().stderr, 'homework')
+                    for _ in range(3))
+        assert spent < IMPORT_BUDGET_MS, (
+            f'Импорт homework занял {spent:.1f} мс при бюджете '
+            f'{IMPORT_BUDGET_MS} мс.'
+        )
+
+    @pytest.mark.timeout(10)
+    def test_heavy_modules_are_lazy(self):
+        result = import_homework(
+            '; import sys; print(*sorted(set(sys.modules) & {%s}))'
+            % ', '.join(repr(name) for name in HEAVY_MODULES)
+        )
+        assert result.stdout.split() == [], (
+            'Тяжёлые зависимости должны загружаться при первом '
+            'использовании.'
+        )
@@ -0,0 +1,73 @@
+from state import StateStore
+
+
+class TestStateStore:
+
+    def test_state_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        with StateStore(path) as store:
+            store.set_timestamp('12345', 1000198000)
+            store.set_message('12345', 777, 'Изменился статус')
+        with StateStore(path) as store:
+            assert store.get_timestamp('12345') == 1000198000
+            assert store.get_message('12345', '777') == 'Изменился статус'
+            assert store.load_timestamps() == {'12345': 1000198000}
+
+    def test_writes_are_batched(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = StateStore(path, flush_size=3, flush_interval=3600)
+        store.set_timestamp('a', 1)
+        store.set_timestamp('b', 2)
+        assert StateStore(path).load_timestamps() == {}, (
+            'Записи должны копиться до заполнения пачки.'
+        )
+        assert store.get_timestamp('a') == 1
+        store.set_message('a', 1, 'text')
+        assert StateStore(path).load_timestamps() == {'a': 1, 'b': 2}
+        store.close()
+
+    def test_store_without_autoflush(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = StateStore(path, flush_size=1, flush_interval=0,
+                           autoflush=False)
+        store.set_timestamp('a', 1)
+        assert StateStore(path).load_timestamps() == {}, (
+            'Без autoflush запись не сбрасывается в вызывающем потоке.'
+        )
+        assert store.get_timestamp('a') == 1
+        store.flush()
+        assert StateStore(path).load_timestamps() == {'a': 1}
+        store.close()
+
+    def test_reads_do_not_wait_for_flush(self, tmp_path):
+        store = StateStore(str(tmp_path / 'state.sqlite3'), autoflush=False)
+        connection = store.connection
+        seen = []
+
+        class Connection:
+
+            def __enter__(self):
+                return connection.__enter__()
+
+            def __exit__(self, *args):
+                return connection.__exit__(*args)
+
+            def executemany(self, *args):
+                seen.append((store.lock.locked(), store.get_timestamp('a'),
+                             store.get_message('a', 1)))
+                store.set_timestamp('a', 2)
+                return connection.executemany(*args)
+
+        store.set_timestamp('a', 1)
+        store.set_message('a', 1, 'text')
+        store.connection = Connection()
+        store.flush()
+        store.connection = connection
+        assert seen[0] == (False, 1, 'text'), (
+            'Запись на диск идёт без общей блокировки, а записываемая '
+            'пачка видна при чтении.'
+        )
+        assert store.get_timestamp('a') == 2, (
+            'Запись во время сброса не теряется.'
+        )
+        store.close()
@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+import requests
+from telebot import apihelper
+
+import transport
+
+
+class TestTransport:
+
+    def test_session_is_shared_and_pooled(self, monkeypatch):
+        monkeypatch.setattr(transport, '_session', None)
+        session = transport.get_session()
+        assert session is transport.get_session()
+        adapter = session.get_adapter('https://practicum.yandex.ru')
+        assert adapter._pool_maxsize == transport.POOL_SIZE
+
+    def test_configure_telebot(self, monkeypatch):
+        for name in ('session', 'CONNECT_TIMEOUT', 'READ_TIMEOUT',
+                     'SESSION_TIME_TO_LIVE'):
+            monkeypatch.setattr(apihelper, name, getattr(apihelper, name))
+        session = transport.build_session()
+        transport.configure_telebot(session)
+        assert apihelper.session is session
+        assert apihelper.CONNECT_TIMEOUT == transport.CONNECT_TIMEOUT
+        assert apihelper.READ_TIMEOUT == transport.READ_TIMEOUT
+
+    def test_get_api_answer_uses_timeout(self, monkeypatch, homework_module):
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs)
+            raise requests.RequestException('stop')
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        try:
+            homework_module.get_api_answer(0)
+        except Exception:
+            pass
+        assert calls[0]['timeout'] == transport.TIMEOUT
+
+    def test_prewarm_ignores_errors(self):
+        methods = []
+
+        def handler(request):
+            methods.append(request.method)
+            raise httpx.ConnectError('down')
+
+        async def run():
+            async with httpx.AsyncClient(
+                    transport=httpx.MockTransport(handler)) as client:
+                await transport.prewarm(client, 'https://example.com/')
+
+        asyncio.run(run())
+        assert methods == ['HEAD']
@@ -0,0 +1,89 @@
+import asyncio
+import functools
+import json
+
+import httpx
+import pytest
+
+import engine
+from delivery import DeliveryQueue
+from webhook import Receiver
+
+
+def push(handler, requests, secret=None, time_before=0):
+    """Отправка запросов приёмнику; возвращает ответы и движок."""
+    tenant = engine.Tenant('token', 42)
+    bot = engine.Engine([tenant], '1234:abcdefg',
+                        delivery=DeliveryQueue(workers=2, chat_rate=100))
+    bot.states[tenant.key].timestamp = time_before
+
+    async def run():
+        receiver = Receiver(bot, secret=secret)
+        port = await receiver.start(0)
+        telegram = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        bot.delivery.start(functools.partial(bot.send_message, telegram))
+        responses = []
+        async with httpx.AsyncClient(
+                base_url=f'http://127.0.0.1:{port}') as client:
+            for method, path, kwargs in requests:
+                responses.append(
+                    await client.request(method, path, **kwargs))
+        await bot.drain()
+        await bot.delivery.stop()
+        await receiver.stop()
+        await telegram.aclose()
+        return responses
+
+    return asyncio.run(run()), bot
+
+
+class TestWebhook:
+
+    def make_handler(self, sent):
+        def handler(request):
+            sent.append(json.loads(request.content)['text'])
+            return httpx.Response(200, json={'ok': True})
+        return handler
+
+    def test_push_is_delivered(self, data_with_new_hw_status):
+        sent = []
+        responses, bot = push(self.make_handler(sent), [
+            ('POST', '/homeworks/42', {'json': data_with_new_hw_status}),
+            ('POST', '/homeworks/42', {'json': data_with_new_hw_status}),
+        ])
+        assert [response.status_code for response in responses] == [202, 202]
+        assert responses[0].json() == {'accepted': 1}
+        assert len(sent) == 1, 'Повторное обновление не должно отправляться.'
+        assert 'Работа проверена' in sent[0]
+        assert bot.states['42'].timestamp == 0, (
+            'Обновление не должно сдвигать from_date сверочного опроса.'
+        )
+
+    @pytest.mark.parametrize('method, path, kwargs, status', [
+        ('GET', '/homeworks/42', {}, 405),
+        ('POST', '/other', {'json': {}}, 404),
+        ('POST', '/homeworks/unknown', {'json': {}}, 404),
+        ('POST', '/homeworks/42', {'json': []}, 400),
+        ('POST', '/homeworks/42', {'json': {'current_date': 1}}, 400),
+        ('POST', '/homeworks/42', {'content': b'not json'}, 400),
+        ('POST', '/homeworks/42',
+         {'json': {'homeworks': [{'homework_name': 'hw', 'status': 'x'}],
+                   'current_date': 1}}, 400),
+    ])
+    def test_invalid_push_is_rejected(self, method, path, kwargs, status):
+        sent = []
+        responses, _ = push(self.make_handler(sent),
+                            [(method, path, kwargs)])
+        assert responses[0].status_code == status
+        assert not sent, 'Некорректное обновление не должно отправляться.'
+
+    def test_secret_is_required(self, data_with_new_hw_status):
+        sent = []
+        responses, _ = push(self.make_handler(sent), [
+            ('POST', '/homeworks/42', {'json': data_with_new_hw_status}),
+            ('POST', '/homeworks/42',
+             {'json': data_with_new_hw_status,
+              'headers': {'Authorization': 'Bearer secret'}}),
+        ], secret='secret')
+        assert [response.status_code for response in responses] == [401, 202]
+        assert len(sent) == 1
@@ -0,0 +1,67 @@
+import logging
+import os
+
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 30))
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+POOL_SIZE = int(os.getenv('POOL_SIZE', 10))
+KEEPALIVE_EXPIRY = float(os.getenv('KEEPALIVE_EXPIRY', 60))
+PREWARM = os.getenv('PREWARM', '').lower() in ('1', 'true', 'yes')
+PREWARM_LEAD = float(os.getenv('PREWARM_LEAD', 5))
+
+_session = None
+
+
+def build_session(pool_size=POOL_SIZE):
+    """Создание сессии requests с пулом keep-alive соединений."""
+    import requests  # type: ignore
+    from requests.adapters import HTTPAdapter  # type: ignore
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Общая для процесса сессия requests."""
+    global _session
+    if _session is None:
+        _session = build_session()
+    return _session
+
+
+def configure_telebot(session=None):
+    """Перевод TeleBot на общую сессию и таймауты транспорта."""
+    from telebot import apihelper  # type: ignore
+
+    apihelper.session = session or get_session()
+    apihelper.CONNECT_TIMEOUT = CONNECT_TIMEOUT
+    apihelper.READ_TIMEOUT = READ_TIMEOUT
+    apihelper.SESSION_TIME_TO_LIVE = None
+
+
+def build_async_client(max_connections, pool_size=POOL_SIZE, **kwargs):
+    """Создание httpx.AsyncClient с ограниченным пулом и таймаутами."""
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, **kwargs)
+
+
+async def prewarm(client, url):
+    """Установка соединения заранее, чтобы опрос не ждал TLS-рукопожатия.
+    Ошибки прогрева не критичны и только логируются.
+    """
+    import httpx
+
+    try:
+        await client.head(url)
+    except httpx.HTTPError as error:
+        logging.debug(f'Не удалось прогреть соединение с {url}: {error}')
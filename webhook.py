@@ -0,0 +1,130 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+
+from decoding import loads
+from exceptions import WrongRequest
+import metrics
+
+WEBHOOK_PORT = os.getenv('WEBHOOK_PORT')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+RECONCILE_PERIOD = int(os.getenv('RECONCILE_PERIOD', 3600))
+MAX_BODY_SIZE = int(os.getenv('WEBHOOK_MAX_BODY_SIZE', 1024 * 1024))
+READ_TIMEOUT = 10
+PATH_PREFIX = '/homeworks/'
+
+WEBHOOK_REQUESTS = metrics.REGISTRY.counter(
+    'homework_webhook_requests_total', 'Запросы к приёмнику обновлений')
+
+REASONS = {
+    202: 'Accepted', 400: 'Bad Request', 401: 'Unauthorized',
+    404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+}
+
+
+async def read_request(reader):
+    """Чтение HTTP-запроса: метод, путь, заголовки и тело."""
+    request_line = (await reader.readline()).decode('latin-1').split()
+    if len(request_line) != 3:
+        raise WrongRequest('Некорректная строка запроса', 400)
+    method, path, _ = request_line
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if line in ('\r\n', '\n', ''):
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise WrongRequest('Некорректный Content-Length', 400)
+    if length > MAX_BODY_SIZE:
+        raise WrongRequest('Слишком большое тело запроса', 413)
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+def authorized(headers, secret):
+    """Проверка общего секрета в заголовке Authorization."""
+    if not secret:
+        return True
+    return hmac.compare_digest(headers.get('authorization', ''),
+                               f'Bearer {secret}')
+
+
+class Receiver:
+    """HTTP-приёмник обновлений статусов для движка.
+    POST /homeworks/<key> с телом в формате ответа API Практикума
+    проверяется check_response и parse_status и сразу ставится
+    в очередь доставки, без опроса API.
+    """
+
+    def __init__(self, engine, secret=WEBHOOK_SECRET):
+        self.engine = engine
+        self.secret = secret
+        self.server = None
+
+    async def start(self, port, host=WEBHOOK_HOST):
+        """Запуск приёмника в текущем цикле событий."""
+        self.server = await asyncio.start_server(self.handle, host, port)
+        port = self.server.sockets[0].getsockname()[1]
+        logging.info(f'Приём обновлений на http://{host}:{port}'
+                     f'{PATH_PREFIX}<key>')
+        return port
+
+    async def stop(self):
+        """Остановка приёмника."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def accept(self, method, path, headers, body):
+        """Проверка запроса и передача обновления движку.
+        Возвращает число работ в принятом обновлении.
+        """
+        if method != 'POST':
+            raise WrongRequest('Ожидается метод POST', 405)
+        if not path.startswith(PATH_PREFIX):
+            raise WrongRequest(f'Неизвестный путь {path}', 404)
+        if not authorized(headers, self.secret):
+            raise WrongRequest('Неверный секрет', 401)
+        tenant = self.engine.tenants.get(path[len(PATH_PREFIX):])
+        if tenant is None:
+            raise WrongRequest('Неизвестный арендатор', 404)
+        try:
+            return self.engine.ingest(tenant, loads(body))
+        except (TypeError, KeyError, ValueError) as error:
+            raise WrongRequest(f'Некорректное обновление: {error}', 400)
+
+    async def handle(self, reader, writer):
+        """Обработка одного соединения: один запрос — один ответ."""
+        try:
+            request = await asyncio.wait_for(read_request(reader),
+                                             READ_TIMEOUT)
+            count = self.accept(*request)
+            status, payload = 202, {'accepted': count}
+        except WrongRequest as error:
+            status, payload = error.status, {'error': str(error)}
+            logging.warning(f'Обновление отклонено: {error}')
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                ConnectionError):
+            writer.close()
+            return
+        WEBHOOK_REQUESTS.inc(str(status))
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        writer.write(
+            f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n'.encode() + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()